@@ -3,20 +3,72 @@
 Script to analyze harmful content in a specific WARC file.
 """
 
+import os
 import sys
 import random
-import gzip
-from warcio.archiveiterator import ArchiveIterator
+from multiprocessing import Pool
 from cs336_data.data import (
+    iter_warc_records,
     extract_text_from_html_bytes,
-    classify_nsfw,
-    classify_toxic_speech
+    classify_nsfw_batch,
+    classify_toxic_speech_batch
 )
 
 # Path to the WARC file
 WARC_FILE = "/Users/lenox/Desktop/ECE491B/assignment2/s2025-assignment2-data/data/CC-MAIN-20180420081400-20180420101400-00118.warc.gz"
 NUM_SAMPLES = 20
 MIN_TEXT_LENGTH = 100
+NUM_WORKERS = os.cpu_count() or 1
+# Skip records larger than this (in bytes) without reading their payload
+MAX_RECORD_BYTES = 5_000_000
+
+
+def iter_html_payloads(warc_path):
+    """
+    Yield the raw HTML payload of every HTML response record in a WARC file.
+    """
+    for record in iter_warc_records(warc_path):
+        # Filter before touching the payload so warcio can skip unread bodies
+        if record.rec_type != 'response':
+            continue
+        
+        content_length = record.rec_headers.get_header('Content-Length')
+        if content_length and content_length.isdigit() and int(content_length) > MAX_RECORD_BYTES:
+            continue
+        
+        # Only process response records with HTML content
+        if not record.http_headers:
+            continue
+        content_type = record.http_headers.get_header('Content-Type')
+        if not content_type or 'text/html' not in content_type.lower():
+            continue
+        
+        try:
+            yield record.content_stream().read()
+        except Exception as e:
+            print(f"Error reading record: {e}")
+            continue
+
+
+def extract_text_worker(html_content):
+    """
+    Extract text from one HTML payload in a worker process.
+    
+    Returns:
+        The extracted text, or None if extraction failed or the text is too short
+    """
+    try:
+        text = extract_text_from_html_bytes(html_content)
+    except Exception as e:
+        print(f"Error extracting text: {e}")
+        return None
+    
+    # Skip texts that are too short
+    if len(text) < MIN_TEXT_LENGTH:
+        return None
+    
+    return text
+
 
 def main():
     """
@@ -24,41 +76,34 @@ def main():
     """
     print(f"Analyzing WARC file: {WARC_FILE}")
     
-    # List to store all extracted texts
-    all_texts = []
+    # Reservoir of sampled texts; only NUM_SAMPLES texts are held in memory
+    reservoir = []
+    n_seen = 0
     
-    # Open the gzipped WARC file
-    with gzip.open(WARC_FILE, 'rb') as warc_file:
-        # Process each record in the WARC file
-        for record in ArchiveIterator(warc_file):
-            # Only process response records with HTML content
-            if (record.rec_type == 'response' and 
-                record.http_headers and 
-                record.http_headers.get_header('Content-Type') and 
-                'text/html' in record.http_headers.get_header('Content-Type').lower()):
-                
-                # Extract text from HTML content
-                try:
-                    html_content = record.content_stream().read()
-                    text = extract_text_from_html_bytes(html_content)
-                    
-                    # Skip texts that are too short
-                    if len(text) < MIN_TEXT_LENGTH:
-                        continue
-                    
-                    # Store the extracted text
-                    all_texts.append(text)
-                except Exception as e:
-                    print(f"Error extracting text: {e}")
-                    continue
+    # Read the WARC file, decompressed with ISA-L when it is installed. The main
+    # process reads records sequentially while the pool extracts text from the
+    # HTML payloads in parallel
+    with Pool(processes=NUM_WORKERS) as pool:
+        for text in pool.imap_unordered(extract_text_worker, iter_html_payloads(WARC_FILE), chunksize=32):
+            if text is None:
+                continue
+            
+            # Reservoir sampling: every text is kept with probability NUM_SAMPLES / n_seen
+            n_seen += 1
+            if len(reservoir) < NUM_SAMPLES:
+                reservoir.append(text)
+            else:
+                j = random.randrange(n_seen)
+                if j < NUM_SAMPLES:
+                    reservoir[j] = text
     
-    print(f"Total documents with text: {len(all_texts)}")
+    print(f"Total documents with text: {n_seen}")
     
-    # If we have enough texts, select random samples
-    if len(all_texts) > 0:
-        # Choose random samples (or all if fewer than requested)
-        sample_size = min(NUM_SAMPLES, len(all_texts))
-        selected_texts = random.sample(all_texts, sample_size)
+    # If we have enough texts, analyze the sampled ones
+    if reservoir:
+        # The reservoir holds NUM_SAMPLES texts (or all if fewer were found)
+        selected_texts = reservoir
+        sample_size = len(selected_texts)
         
         # Track statistics
         nsfw_count = 0
@@ -74,14 +119,11 @@ def main():
         print(" HARMFUL CONTENT ANALYSIS RESULTS ".center(80, "="))
         print("="*80 + "\n")
         
-        for i, text in enumerate(selected_texts, 1):
-            # Truncate text for display
-            display_text = text[:500] + "..." if len(text) > 500 else text
-            
-            # Classify the text
-            nsfw_result = classify_nsfw(text)
-            toxic_result = classify_toxic_speech(text)
-            
+        # Classify all samples with one model call per classifier
+        nsfw_results = classify_nsfw_batch(selected_texts)
+        toxic_results = classify_toxic_speech_batch(selected_texts)
+        
+        for i, (text, nsfw_result, toxic_result) in enumerate(zip(selected_texts, nsfw_results, toxic_results), 1):
             nsfw_label, nsfw_confidence = nsfw_result
             toxic_label, toxic_confidence = toxic_result
             
@@ -105,34 +147,40 @@ def main():
             
             # Print the sample
             print(f"SAMPLE {i}:")
-            print(f"Text: {display_text}")
+            # Truncate text for display
+            print(f"Text: {text[:500]}{'...' if len(text) > 500 else ''}")
             print(f"NSFW: {nsfw_label} (confidence: {nsfw_confidence:.4f})")
             print(f"Toxic: {toxic_label} (confidence: {toxic_confidence:.4f})")
             print("-"*80)
         
-        # Print summary statistics
-        print("\nSUMMARY STATISTICS:")
-        print(f"Total samples analyzed: {sample_size}")
-        print(f"NSFW content: {nsfw_count} ({nsfw_count/sample_size*100:.1f}%)")
-        print(f"Toxic content: {toxic_count} ({toxic_count/sample_size*100:.1f}%)")
-        print(f"Harmful content (NSFW or toxic): {harmful_count} ({harmful_count/sample_size*100:.1f}%)")
+        # Build the summary and write it out in one call
+        summary_lines = [
+            "\nSUMMARY STATISTICS:",
+            f"Total samples analyzed: {sample_size}",
+            f"NSFW content: {nsfw_count} ({nsfw_count/sample_size*100:.1f}%)",
+            f"Toxic content: {toxic_count} ({toxic_count/sample_size*100:.1f}%)",
+            f"Harmful content (NSFW or toxic): {harmful_count} ({harmful_count/sample_size*100:.1f}%)",
+        ]
         
-        # Print threshold analysis
-        print("\nNSFW THRESHOLD ANALYSIS:")
+        # Threshold analysis
+        summary_lines.append("\nNSFW THRESHOLD ANALYSIS:")
         for threshold in sorted(nsfw_thresholds.keys()):
             count = nsfw_thresholds[threshold]
-            print(f"  >= {threshold:.1f}: {count} samples ({count/sample_size*100:.1f}%)")
+            summary_lines.append(f"  >= {threshold:.1f}: {count} samples ({count/sample_size*100:.1f}%)")
         
-        print("\nTOXIC THRESHOLD ANALYSIS:")
+        summary_lines.append("\nTOXIC THRESHOLD ANALYSIS:")
         for threshold in sorted(toxic_thresholds.keys()):
             count = toxic_thresholds[threshold]
-            print(f"  >= {threshold:.1f}: {count} samples ({count/sample_size*100:.1f}%)")
+            summary_lines.append(f"  >= {threshold:.1f}: {count} samples ({count/sample_size*100:.1f}%)")
         
-        print("\nRECOMMENDATIONS FOR MANUAL VERIFICATION:")
-        print("1. Compare the classifier predictions to your own judgment.")
-        print("2. Note any classifier errors (false positives or false negatives).")
-        print("3. Based on your observations, determine suitable confidence thresholds.")
-        print("4. Consider the trade-off between filtering harmful content and preserving non-harmful content.")
+        summary_lines += [
+            "\nRECOMMENDATIONS FOR MANUAL VERIFICATION:",
+            "1. Compare the classifier predictions to your own judgment.",
+            "2. Note any classifier errors (false positives or false negatives).",
+            "3. Based on your observations, determine suitable confidence thresholds.",
+            "4. Consider the trade-off between filtering harmful content and preserving non-harmful content.",
+        ]
+        sys.stdout.write("\n".join(summary_lines) + "\n")
     else:
         print("No text samples were found in the WARC file.")
 
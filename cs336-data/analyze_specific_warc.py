@@ -9,18 +9,28 @@ This script extracts text from a specific WARC file, analyzes it for harmful con
 import os
 import sys
 import random
-import gzip
 from pathlib import Path
+from bisect import bisect_right
 from datetime import datetime
 from collections import Counter
 
-from warcio.archiveiterator import ArchiveIterator
 from cs336_data.data import (
-    extract_text_from_html_bytes,
-    classify_nsfw,
-    classify_toxic_speech
+    iter_warc_texts,
+    identify_language_batch,
+    classify_cached
 )
 
+# Confidence thresholds reported in the threshold analysis, in increasing order
+THRESHOLDS = [0.5, 0.6, 0.7, 0.8, 0.9]
+
+# Texts identified as English with lower confidence than this are not classified
+MIN_ENGLISH_CONFIDENCE = 0.5
+# Classifier result reported for texts that were not classified
+SKIPPED_RESULT = ("skipped", 0.0)
+
+# Cache of classifier results across runs, kept next to the analysis reports
+CLASSIFY_CACHE_PATH = "classify_cache.db"
+
 
 def analyze_warc_file(warc_path, num_samples=20, min_text_length=100):
     """
@@ -38,65 +48,69 @@ def analyze_warc_file(warc_path, num_samples=20, min_text_length=100):
     
     # List to store text samples and their analysis results
     samples = []
-    all_texts = []
+    
+    # Reservoir of sampled texts; only num_samples texts are held in memory
+    reservoir = []
+    n_seen = 0
     
     # Process the WARC file
-    open_func = gzip.open if str(warc_path).endswith('.gz') else open
-    
-    with open_func(warc_path, 'rb') as warc_file:
-        for record in ArchiveIterator(warc_file):
-            # Only process response records with HTML content
-            if (record.rec_type == 'response' and 
-                record.http_headers and 
-                record.http_headers.get_header('Content-Type') and 
-                'text/html' in record.http_headers.get_header('Content-Type').lower()):
-                
-                # Extract text from HTML content
-                html_content = record.content_stream().read()
-                try:
-                    text = extract_text_from_html_bytes(html_content)
-                    
-                    # Skip texts that are too short
-                    if len(text) < min_text_length:
-                        continue
-                    
-                    # Store the extracted text
-                    all_texts.append(text)
-                except Exception as e:
-                    print(f"Error extracting text: {e}")
-                    continue
-    
-    # If we have enough texts, select random samples
-    if len(all_texts) > 0:
-        # Choose random samples (or all if fewer than requested)
-        sample_size = min(num_samples, len(all_texts))
-        selected_texts = random.sample(all_texts, sample_size)
+    for text, _ in iter_warc_texts(warc_path, min_length=min_text_length):
+        # Reservoir sampling: every text is kept with probability num_samples / n_seen
+        n_seen += 1
+        if len(reservoir) < num_samples:
+            reservoir.append(text)
+        else:
+            j = random.randrange(n_seen)
+            if j < num_samples:
+                reservoir[j] = text
+    
+    # If we have enough texts, analyze the sampled ones
+    if reservoir:
+        # The reservoir holds num_samples texts (or all if fewer were found)
+        selected_texts = reservoir
+        
+        # The classifiers are trained on English: only texts identified as English are
+        # classified, the others are reported as skipped
+        is_english = [
+            lang_code == 'en' and confidence >= MIN_ENGLISH_CONFIDENCE
+            for lang_code, confidence in identify_language_batch(selected_texts)
+        ]
+        english_texts = [text for text, english in zip(selected_texts, is_english) if english]
+        
+        # Classify all English texts with one model call per classifier; results of
+        # earlier runs are read back from the on-disk cache
+        nsfw_results = iter(classify_cached("nsfw", english_texts, CLASSIFY_CACHE_PATH))
+        toxic_results = iter(classify_cached("toxic", english_texts, CLASSIFY_CACHE_PATH))
         
         # Analyze each selected text
-        for text in selected_texts:
+        for text, english in zip(selected_texts, is_english):
             # Truncate text for display
             display_text = text[:500] + "..." if len(text) > 500 else text
             
-            # Classify the text
-            nsfw_result = classify_nsfw(text)
-            toxic_result = classify_toxic_speech(text)
-            
             # Add to samples
-            samples.append((display_text, nsfw_result, toxic_result))
+            if english:
+                samples.append((display_text, next(nsfw_results), next(toxic_results)))
+            else:
+                samples.append((display_text, SKIPPED_RESULT, SKIPPED_RESULT))
     
-    return samples, len(all_texts)
+    return samples, n_seen
 
 
-def print_analysis_results(samples):
+def format_analysis_results(samples):
     """
-    Print the analysis results in a readable format.
+    Format the analysis results in a readable format.
     
     Args:
         samples: List of tuples (text, nsfw_result, toxic_result)
+    
+    Returns:
+        The report as a single string, ready to be written out in one call
     """
-    print("\n" + "="*80)
-    print(" HARMFUL CONTENT ANALYSIS RESULTS ".center(80, "="))
-    print("="*80 + "\n")
+    lines = []
+    
+    lines.append("\n" + "="*80)
+    lines.append(" HARMFUL CONTENT ANALYSIS RESULTS ".center(80, "="))
+    lines.append("="*80 + "\n")
     
     # Track statistics
     nsfw_count = 0
@@ -104,11 +118,11 @@ def print_analysis_results(samples):
     nsfw_confidence_sum = 0
     toxic_confidence_sum = 0
     
-    # Confidence threshold counters
-    nsfw_thresholds = {0.5: 0, 0.6: 0, 0.7: 0, 0.8: 0, 0.9: 0}
-    toxic_thresholds = {0.5: 0, 0.6: 0, 0.7: 0, 0.8: 0, 0.9: 0}
+    # Confidence histograms: bucket i counts confidences in [THRESHOLDS[i - 1], THRESHOLDS[i])
+    nsfw_buckets = [0] * (len(THRESHOLDS) + 1)
+    toxic_buckets = [0] * (len(THRESHOLDS) + 1)
     
-    # Print each sample with its classification
+    # Add each sample with its classification
     for i, (text, nsfw_result, toxic_result) in enumerate(samples, 1):
         nsfw_label, nsfw_confidence = nsfw_result
         toxic_label, toxic_confidence = toxic_result
@@ -117,44 +131,47 @@ def print_analysis_results(samples):
         if nsfw_label == "nsfw":
             nsfw_count += 1
             nsfw_confidence_sum += nsfw_confidence
-            # Update threshold counters
-            for threshold in nsfw_thresholds:
-                if nsfw_confidence >= threshold:
-                    nsfw_thresholds[threshold] += 1
+            # Update the confidence histogram
+            nsfw_buckets[bisect_right(THRESHOLDS, nsfw_confidence)] += 1
         
         if toxic_label == "toxic":
             toxic_count += 1
             toxic_confidence_sum += toxic_confidence
-            # Update threshold counters
-            for threshold in toxic_thresholds:
-                if toxic_confidence >= threshold:
-                    toxic_thresholds[threshold] += 1
+            # Update the confidence histogram
+            toxic_buckets[bisect_right(THRESHOLDS, toxic_confidence)] += 1
         
-        # Print the sample
-        print(f"SAMPLE {i}:")
-        print(f"Text: {text}")
-        print(f"NSFW: {nsfw_label} (confidence: {nsfw_confidence:.4f})")
-        print(f"Toxic: {toxic_label} (confidence: {toxic_confidence:.4f})")
-        print("-"*80)
-    
-    # Print summary statistics
+        # Add the sample
+        lines.append(f"SAMPLE {i}:")
+        lines.append(f"Text: {text}")
+        lines.append(f"NSFW: {nsfw_label} (confidence: {nsfw_confidence:.4f})")
+        lines.append(f"Toxic: {toxic_label} (confidence: {toxic_confidence:.4f})")
+        lines.append("-"*80)
+    
+    # Summary statistics
     total_samples = len(samples)
-    print("\nSUMMARY STATISTICS:")
-    print(f"Total samples analyzed: {total_samples}")
-    print(f"NSFW content: {nsfw_count} ({nsfw_count/total_samples*100:.1f}%)")
-    print(f"Toxic content: {toxic_count} ({toxic_count/total_samples*100:.1f}%)")
-    
-    # Print threshold analysis
-    print("\nNSFW THRESHOLD ANALYSIS:")
-    for threshold, count in sorted(nsfw_thresholds.items()):
-        print(f"  >= {threshold:.1f}: {count} samples ({count/total_samples*100:.1f}%)")
-    
-    print("\nTOXIC THRESHOLD ANALYSIS:")
-    for threshold, count in sorted(toxic_thresholds.items()):
-        print(f"  >= {threshold:.1f}: {count} samples ({count/total_samples*100:.1f}%)")
-    
-    print("\nNOTE: Please manually verify these classifications and note any errors.")
-    print("Based on your observations, determine suitable confidence thresholds.")
+    lines.append("\nSUMMARY STATISTICS:")
+    lines.append(f"Total samples analyzed: {total_samples}")
+    lines.append(f"NSFW content: {nsfw_count} ({nsfw_count/total_samples*100:.1f}%)")
+    lines.append(f"Toxic content: {toxic_count} ({toxic_count/total_samples*100:.1f}%)")
+    skipped_count = sum(1 for _, nsfw_result, _ in samples if nsfw_result == SKIPPED_RESULT)
+    if skipped_count:
+        lines.append(f"Skipped (not English): {skipped_count} ({skipped_count/total_samples*100:.1f}%)")
+    
+    # Threshold analysis: samples at or above a threshold are those in the buckets after it
+    lines.append("\nNSFW THRESHOLD ANALYSIS:")
+    for i, threshold in enumerate(THRESHOLDS):
+        count = sum(nsfw_buckets[i + 1:])
+        lines.append(f"  >= {threshold:.1f}: {count} samples ({count/total_samples*100:.1f}%)")
+    
+    lines.append("\nTOXIC THRESHOLD ANALYSIS:")
+    for i, threshold in enumerate(THRESHOLDS):
+        count = sum(toxic_buckets[i + 1:])
+        lines.append(f"  >= {threshold:.1f}: {count} samples ({count/total_samples*100:.1f}%)")
+    
+    lines.append("\nNOTE: Please manually verify these classifications and note any errors.")
+    lines.append("Based on your observations, determine suitable confidence thresholds.")
+    
+    return "\n".join(lines) + "\n"
 
 
 if __name__ == "__main__":
@@ -181,19 +198,13 @@ if __name__ == "__main__":
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_file = f"harmful_content_analysis_{timestamp}.txt"
         
-        # Save to file and print to console
+        # Format the report once, then save it to file and print it to console
+        report = format_analysis_results(samples)
         with open(output_file, 'w', encoding='utf-8') as f:
-            # Redirect stdout to file
-            original_stdout = sys.stdout
-            sys.stdout = f
-            
-            print_analysis_results(samples)
-            
-            # Restore stdout
-            sys.stdout = original_stdout
+            f.write(report)
         
         print(f"\nResults saved to {output_file}")
-        print_analysis_results(samples)
+        sys.stdout.write(report)
         
         print(f"\nTotal documents processed: {total_documents}")
         harmful_count = sum(1 for _, (nsfw_label, _), (toxic_label, _) in samples if nsfw_label == "nsfw" or toxic_label == "toxic")
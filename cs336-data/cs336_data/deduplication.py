@@ -4,52 +4,113 @@ Module for document deduplication methods.
 """
 
 import os
-import hashlib
+import functools
 from pathlib import Path
-from collections import Counter
-from typing import List, Dict, Set
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Set, Tuple
 import re
 import random
+import shutil
 import unicodedata
 import mmh3  # MurmurHash3 for fast hashing
+import numpy as np
 
+# Optional: Numba compiles the corpus-wide MinHash kernel and runs it on all cores
+try:
+    import numba
+except ImportError:
+    numba = None
 
-def hash_line(line: str) -> str:
+
+def hash_line(line: bytes) -> int:
     """
     Create a hash for a line of text.
     
+    Uses 64-bit MurmurHash3, which is much cheaper than a cryptographic hash and gives
+    compact int keys; collisions are negligible at corpus scale.
+    
     Args:
-        line: The line to hash
+        line: The raw bytes of the line to hash
         
     Returns:
-        A string representation of the hash
+        An unsigned 64-bit integer hash
     """
-    return hashlib.md5(line.encode('utf-8')).hexdigest()
+    return mmh3.hash64(line, signed=False)[0]
 
 
-def count_line_frequency(file_paths: List[os.PathLike]) -> Dict[str, int]:
+def _find_line_occurrences(file_paths: List[os.PathLike]) -> Tuple[Set[int], Set[int]]:
     """
-    Count the frequency of each line (using hashes) across all input files.
-    
-    Args:
-        file_paths: List of paths to input files
-        
-    Returns:
-        Dictionary mapping line hashes to their frequency
+    Split the line hashes of one shard of the input files into those seen once and more than once.
     """
-    line_counter = Counter()
+    seen_once = set()
+    seen_multi = set()
     
     for file_path in file_paths:
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            # Read raw bytes; lines are hashed without decoding them
+            with open(file_path, 'rb') as f:
                 for line in f:
-                    # Use hash of the line as the key
                     line_hash = hash_line(line)
-                    line_counter[line_hash] += 1
-        except (IOError, UnicodeDecodeError) as e:
+                    if line_hash in seen_multi:
+                        continue
+                    if line_hash in seen_once:
+                        seen_once.discard(line_hash)
+                        seen_multi.add(line_hash)
+                    else:
+                        seen_once.add(line_hash)
+        except IOError as e:
             print(f"Warning: Could not process {file_path}: {e}")
     
-    return line_counter
+    return seen_once, seen_multi
+
+
+def _map_file_shards(worker, file_paths: List[os.PathLike], num_workers: int = None) -> list:
+    """
+    Apply worker to shards of file_paths, in parallel processes when there is more than one shard.
+    
+    Args:
+        worker: Module-level function taking a list of file paths
+        file_paths: List of paths to input files
+        num_workers: Number of worker processes (defaults to the number of CPUs)
+        
+    Returns:
+        List of the worker results, one per shard
+    """
+    num_shards = min(num_workers or os.cpu_count() or 1, len(file_paths))
+    if num_shards <= 1:
+        return [worker(file_paths)]
+    
+    shards = [file_paths[i::num_shards] for i in range(num_shards)]
+    with ProcessPoolExecutor(max_workers=num_shards) as executor:
+        return list(executor.map(worker, shards))
+
+
+def find_unique_line_hashes(file_paths: List[os.PathLike], num_workers: int = None) -> Set[int]:
+    """
+    Find the hashes of lines that appear exactly once across all input files.
+    
+    Rather than counting every line, each hash moves from a seen-once set to a
+    seen-multiple-times set on its second occurrence, so only membership is tracked.
+    The files are split into shards that are processed in parallel and then merged.
+    
+    Args:
+        file_paths: List of paths to input files
+        num_workers: Number of worker processes (defaults to the number of CPUs)
+        
+    Returns:
+        Set of hashes of lines that occur exactly once in the corpus
+    """
+    seen_once = set()
+    seen_multi = set()
+    
+    for shard_once, shard_multi in _map_file_shards(_find_line_occurrences, file_paths, num_workers):
+        # A hash is seen multiple times if it was in either shard more than once, or once in both
+        seen_multi |= shard_multi
+        seen_multi |= seen_once & shard_once
+        seen_once ^= shard_once
+        seen_once -= seen_multi
+    
+    return seen_once
 
 
 def exact_line_deduplication(input_files: List[os.PathLike], output_directory: os.PathLike):
@@ -57,7 +118,7 @@ def exact_line_deduplication(input_files: List[os.PathLike], output_directory: o
     Perform exact line deduplication on a list of input files.
     
     The function:
-    1. Counts the frequency of each line across all input files
+    1. Finds the lines that appear exactly once across all input files
     2. Rewrites each file to the output directory, keeping only lines that are unique in the corpus
     
     Args:
@@ -68,11 +129,8 @@ def exact_line_deduplication(input_files: List[os.PathLike], output_directory: o
     output_dir = Path(output_directory)
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Count line frequencies across all files
-    line_frequencies = count_line_frequency(input_files)
-    
-    # Keep track of which lines to keep (those with frequency 1)
-    unique_line_hashes = {line_hash for line_hash, freq in line_frequencies.items() if freq == 1}
+    # Keep track of which lines to keep (those that appear exactly once across all files)
+    unique_line_hashes = find_unique_line_hashes(input_files)
     
     # Process each file and write deduplicated versions
     for input_file in input_files:
@@ -80,19 +138,24 @@ def exact_line_deduplication(input_files: List[os.PathLike], output_directory: o
         output_path = output_dir / input_path.name
         
         try:
-            # Read input file and filter out non-unique lines
-            with open(input_path, 'r', encoding='utf-8') as in_file, \
-                 open(output_path, 'w', encoding='utf-8') as out_file:
+            # Read input file and filter out non-unique lines, copying the raw bytes through
+            with open(input_path, 'rb') as in_file, \
+                 open(output_path, 'wb') as out_file:
                 
                 for line in in_file:
                     line_hash = hash_line(line)
                     # Only keep lines that appear exactly once in the corpus
                     if line_hash in unique_line_hashes:
                         out_file.write(line)
-        except (IOError, UnicodeDecodeError) as e:
+        except IOError as e:
             print(f"Warning: Error processing {input_file}: {e}") 
 
 
+# Precompiled regular expressions used by normalize_text
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
 def normalize_text(text: str) -> str:
     """
     Normalize text for fuzzy matching.
@@ -110,10 +173,10 @@ def normalize_text(text: str) -> str:
     text = text.lower()
     
     # Remove punctuation
-    text = re.sub(r'[^\w\s]', ' ', text)
+    text = _PUNCTUATION_RE.sub(' ', text)
     
     # Normalize whitespace (replace multiple whitespace with single space)
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = _WHITESPACE_RE.sub(' ', text).strip()
     
     # Remove accents
     text = ''.join(c for c in text if not unicodedata.combining(c))
@@ -121,63 +184,189 @@ def normalize_text(text: str) -> str:
     return text
 
 
-def create_ngrams(text: str, n: int) -> Set[str]:
+# Multiplier of the polynomial n-gram hash (the 64-bit FNV prime)
+_NGRAM_HASH_MULTIPLIER = np.uint64(1099511628211)
+
+
+def _combine_word_hashes(word_hashes: np.ndarray, n: int) -> np.ndarray:
+    """
+    Combine per-word hashes into the polynomial hash of every window of n words.
+    
+    The hash of words i..i+n-1 is sum(word_hashes[i + k] * M**(n - 1 - k)) mod 2**64,
+    built with n vectorized shift-and-add steps over all windows at once.
+    
+    Args:
+        word_hashes: Array of per-word hashes (uint64)
+        n: Size of n-grams
+        
+    Returns:
+        Array with one hash per n-gram, in text order
+    """
+    num_ngrams = max(0, len(word_hashes) - n + 1)
+    ngram_hashes = np.zeros(num_ngrams, dtype=np.uint64)
+    for k in range(n):
+        ngram_hashes *= _NGRAM_HASH_MULTIPLIER
+        ngram_hashes += word_hashes[k:k + num_ngrams]
+    return ngram_hashes
+
+
+def _hash_words(words: List[str]) -> np.ndarray:
+    """
+    Hash each word to a 64-bit MurmurHash3 value.
+    """
+    return np.fromiter(
+        (mmh3.hash64(word, signed=False)[0] for word in words),
+        dtype=np.uint64,
+        count=len(words),
+    )
+
+
+def hash_ngrams(text: str, n: int) -> np.ndarray:
     """
-    Create word n-grams from text.
+    Create the hashed word n-grams of a text.
+    
+    Each word is hashed once and the n-gram hashes are rolled from the word hashes, so no
+    n-gram string is ever built; a document's n-grams are kept as one compact array instead
+    of a set of strings. Collisions are negligible at 64 bits.
     
     Args:
         text: Input text
         n: Size of n-grams
         
     Returns:
-        Set of n-gram strings
+        Sorted array of the distinct n-gram hashes (uint64)
     """
     # Split text into words
     words = text.split()
     
-    # Create n-grams
-    ngrams = set()
-    for i in range(len(words) - n + 1):
-        ngram = ' '.join(words[i:i + n])
-        ngrams.add(ngram)
+    # Hash each n-gram and deduplicate
+    return np.unique(_combine_word_hashes(_hash_words(words), n))
+
+
+# Mersenne prime modulus for the universal hash family used by MinHash
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Number of n-grams whose permuted hashes are computed in one vectorized block
+_MINHASH_BLOCK_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=None)
+def _minhash_permutations(num_hashes: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Draw the (a, b) parameters of the hash functions h_i(x) = (a_i * x + b_i) mod P.
     
-    return ngrams
+    Both parameters are below 2**32, like the 32-bit base hashes, so a * x + b never
+    overflows uint64.
+    
+    Args:
+        num_hashes: Number of hash functions
+        seed: Seed for the random parameters
+        
+    Returns:
+        Tuple of uint64 arrays (a, b), each of length num_hashes
+    """
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, 1 << 32, size=num_hashes, dtype=np.uint64)
+    b = rng.randint(0, 1 << 32, size=num_hashes, dtype=np.uint64)
+    return a, b
 
 
-def compute_minhash_signature(ngrams: Set[str], num_hashes: int, seed: int = 42) -> List[int]:
+def _minhash_from_hashes(ngram_hashes: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
     """
-    Compute MinHash signature for a set of n-grams.
+    Compute a MinHash signature from a document's n-gram hashes with NumPy.
+    
+    The low 32 bits of each n-gram hash are the base value x of the universal hashes
+    (a * x + b) mod P, evaluated for blocks of n-grams at a time.
     
     Args:
-        ngrams: Set of n-grams
-        num_hashes: Number of hash functions to use
-        seed: Seed for random hash functions
+        ngram_hashes: Array of n-gram hashes (uint64), at least one
+        a: Multipliers of the hash functions
+        b: Offsets of the hash functions
         
     Returns:
-        List of minhash values (signature)
+        Array of minhash values (uint32), one per hash function
     """
-    if not ngrams:
-        return [0] * num_hashes
+    base_hashes = ngram_hashes & _MAX_HASH
     
-    # Initialize signature with maximum possible hash value
-    signature = [float('inf')] * num_hashes
+    # Initialize signature with maximum possible hash value; every minhash fits in 32 bits
+    signature = np.full(a.size, _MAX_HASH, dtype=np.uint32)
     
-    # For each n-gram, compute hashes and keep the minimum for each hash function
-    for ngram in ngrams:
-        for i in range(num_hashes):
-            # Use different seeds for each hash function
-            hash_value = mmh3.hash(ngram, seed + i)
-            signature[i] = min(signature[i], hash_value)
+    # For each block of n-grams, compute all permuted hashes and keep the minimum for each hash function
+    for start in range(0, len(base_hashes), _MINHASH_BLOCK_SIZE):
+        block = base_hashes[start:start + _MINHASH_BLOCK_SIZE, np.newaxis]
+        permuted = (block * a + b) % _MERSENNE_PRIME & _MAX_HASH
+        np.minimum(signature, permuted.min(axis=0), out=signature, casting='unsafe')
     
     return signature
 
 
-def apply_lsh(signatures: Dict[str, List[int]], num_bands: int) -> Dict[int, List[str]]:
+if numba is not None:
+    @numba.njit(parallel=True, cache=True)
+    def _minhash_kernel(base_hashes, offsets, a, b, prime, max_hash):
+        """
+        Compute the MinHash signatures of all documents from their packed base hashes.
+        
+        Document d owns base_hashes[offsets[d]:offsets[d + 1]]; documents are processed in parallel.
+        """
+        num_docs = offsets.size - 1
+        signatures = np.empty((num_docs, a.size), dtype=np.uint32)
+        for d in numba.prange(num_docs):
+            for k in range(a.size):
+                minimum = max_hash
+                for j in range(offsets[d], offsets[d + 1]):
+                    value = (base_hashes[j] * a[k] + b[k]) % prime & max_hash
+                    if value < minimum:
+                        minimum = value
+                signatures[d, k] = minimum
+        return signatures
+
+
+def compute_minhash_signatures(
+    doc_ngram_hashes: List[np.ndarray], num_hashes: int, seed: int = 42
+) -> np.ndarray:
+    """
+    Compute the MinHash signatures of many documents at once.
+    
+    With Numba installed, the n-gram hashes of all documents are packed into one flat array
+    and reduced by a parallel compiled kernel; otherwise each document is computed with NumPy.
+    
+    Args:
+        doc_ngram_hashes: One array of n-gram hashes (as from hash_ngrams) per document
+        num_hashes: Number of hash functions to use
+        seed: Seed for random hash functions
+        
+    Returns:
+        Array (uint32) of shape (num_docs, num_hashes) holding one signature per row
+    """
+    a, b = _minhash_permutations(num_hashes, seed)
+    
+    # Documents without n-grams get an all-zero signature
+    if numba is None:
+        signatures = np.zeros((len(doc_ngram_hashes), num_hashes), dtype=np.uint32)
+        for i, ngram_hashes in enumerate(doc_ngram_hashes):
+            if ngram_hashes.size:
+                signatures[i] = _minhash_from_hashes(ngram_hashes, a, b)
+        return signatures
+    
+    # Pack the base hashes of every document into one array, indexed by per-document offsets
+    offsets = np.zeros(len(doc_ngram_hashes) + 1, dtype=np.int64)
+    np.cumsum([ngram_hashes.size for ngram_hashes in doc_ngram_hashes], out=offsets[1:])
+    base_hashes = np.concatenate(doc_ngram_hashes) if doc_ngram_hashes else np.empty(0, dtype=np.uint64)
+    base_hashes &= _MAX_HASH
+    
+    signatures = _minhash_kernel(base_hashes, offsets, a, b, _MERSENNE_PRIME, _MAX_HASH)
+    signatures[offsets[1:] == offsets[:-1]] = 0
+    return signatures
+
+
+def apply_lsh(signatures: np.ndarray, doc_ids: List[str], num_bands: int) -> Dict[int, List[str]]:
     """
     Apply Locality-Sensitive Hashing (LSH) to group similar documents.
     
     Args:
-        signatures: Dictionary mapping document paths to their minhash signatures
+        signatures: Array of shape (num_docs, num_hashes) holding one minhash signature per row
+        doc_ids: Document paths, one per row of signatures
         num_bands: Number of bands to divide signatures into
         
     Returns:
@@ -187,23 +376,24 @@ def apply_lsh(signatures: Dict[str, List[int]], num_bands: int) -> Dict[int, Lis
     buckets = {}
     
     # Calculate rows per band
-    if not signatures:
+    if len(doc_ids) == 0:
         return buckets
         
-    num_hashes = len(next(iter(signatures.values())))
+    num_hashes = signatures.shape[1]
     rows_per_band = num_hashes // num_bands
     
-    # For each document
-    for doc_path, signature in signatures.items():
-        # For each band
-        for band_idx in range(num_bands):
-            # Extract the portion of the signature for this band
-            start_idx = band_idx * rows_per_band
-            end_idx = start_idx + rows_per_band
-            band = tuple(signature[start_idx:end_idx])
-            
-            # Create a hash for this band
-            band_hash = hash((band_idx, band))
+    # For each band
+    for band_idx in range(num_bands):
+        # Extract the portion of every signature for this band as one contiguous buffer
+        start_idx = band_idx * rows_per_band
+        end_idx = start_idx + rows_per_band
+        band_bytes = np.ascontiguousarray(signatures[:, start_idx:end_idx]).tobytes()
+        row_stride = len(band_bytes) // len(doc_ids)
+        
+        # For each document
+        for i, doc_path in enumerate(doc_ids):
+            # Create a hash for this band (seeded by the band index so bands never share buckets)
+            band_hash = mmh3.hash64(band_bytes[i * row_stride:(i + 1) * row_stride], band_idx)[0]
             
             # Add document to the appropriate bucket
             if band_hash not in buckets:
@@ -213,102 +403,127 @@ def apply_lsh(signatures: Dict[str, List[int]], num_bands: int) -> Dict[int, Lis
     return buckets
 
 
-def compute_jaccard_similarity(set1: Set[str], set2: Set[str]) -> float:
+def compute_jaccard_similarity(hashes1: np.ndarray, hashes2: np.ndarray) -> float:
     """
-    Compute Jaccard similarity between two sets.
+    Compute Jaccard similarity between two sets of n-gram hashes.
     
     Args:
-        set1: First set
-        set2: Second set
+        hashes1: First set, as a sorted array of distinct hashes
+        hashes2: Second set, as a sorted array of distinct hashes
         
     Returns:
         Jaccard similarity (intersection size / union size)
     """
-    if not set1 and not set2:
+    if hashes1.size == 0 and hashes2.size == 0:
         return 1.0  # Both empty sets are identical
     
-    intersection = len(set1.intersection(set2))
-    union = len(set1.union(set2))
+    intersection = np.intersect1d(hashes1, hashes2, assume_unique=True).size
+    union = hashes1.size + hashes2.size - intersection
     
     return intersection / union
 
 
+# Minimum gap between the Jaccard threshold and the MinHash estimate for a pair to be rejected early
+_MINHASH_PRESCREEN_MARGIN = 0.05
+
+
 def find_duplicate_clusters(
     candidates: Dict[int, List[str]], 
-    doc_ngrams: Dict[str, Set[str]], 
-    jaccard_threshold: float
+    doc_ngrams: Dict[str, np.ndarray], 
+    jaccard_threshold: float,
+    signatures: np.ndarray = None
 ) -> List[List[str]]:
     """
     Find clusters of duplicate documents based on Jaccard similarity.
     
+    If MinHash signatures are given, pairs whose estimated Jaccard similarity (the fraction
+    of matching signature entries) is clearly below the threshold are rejected without
+    computing the exact similarity.
+    
     Args:
         candidates: Dictionary mapping bucket hashes to lists of document paths
-        doc_ngrams: Dictionary mapping document paths to their n-grams
+        doc_ngrams: Dictionary mapping document paths to their n-gram hashes (as from hash_ngrams)
         jaccard_threshold: Minimum Jaccard similarity to consider documents as duplicates
+        signatures: Optional MinHash signatures, one row per document in doc_ngrams order
         
     Returns:
         List of document clusters (each cluster is a list of document paths)
     """
-    # Dictionary to track duplicate pairs
-    duplicates = {}
+    # Union-find over integer document indices: each document starts in its own set
+    doc_index = {doc: i for i, doc in enumerate(doc_ngrams)}
+    docs = list(doc_ngrams)
+    parent = list(range(len(docs)))
+    rank = [0] * len(docs)
+    
+    def find(i: int) -> int:
+        # Find the root of i's set, pointing every node on the path directly at it
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+    
+    def union(i: int, j: int):
+        # Merge the sets of i and j, attaching the shallower tree under the deeper one
+        root_i, root_j = find(i), find(j)
+        if root_i == root_j:
+            return
+        if rank[root_i] < rank[root_j]:
+            root_i, root_j = root_j, root_i
+        parent[root_j] = root_i
+        if rank[root_i] == rank[root_j]:
+            rank[root_i] += 1
+    
+    # Pairs whose similarity has already been computed (a pair can share several buckets),
+    # keyed as smaller_index * num_docs + larger_index
+    seen_pairs = set()
+    num_docs = len(docs)
+    
+    # Estimated similarity below which a pair is rejected: the margin is three standard errors
+    # of the estimate at its widest (J = 0.5), and never less than _MINHASH_PRESCREEN_MARGIN
+    if signatures is not None:
+        num_hashes = signatures.shape[1]
+        margin = max(_MINHASH_PRESCREEN_MARGIN, 3 * (0.25 / num_hashes) ** 0.5)
+        min_matching_hashes = (jaccard_threshold - margin) * num_hashes
     
     # For each bucket, check all pairs for similarity
     for bucket, doc_paths in candidates.items():
         if len(doc_paths) < 2:
             continue
+        
+        indices = [doc_index[doc] for doc in doc_paths]
             
         # Check all pairs in this bucket
-        for i in range(len(doc_paths)):
-            for j in range(i + 1, len(doc_paths)):
-                doc1 = doc_paths[i]
-                doc2 = doc_paths[j]
+        for i in range(len(indices)):
+            for j in range(i + 1, len(indices)):
+                index1, index2 = sorted((indices[i], indices[j]))
+                
+                # Skip pairs already compared and pairs already in the same cluster
+                pair_key = index1 * num_docs + index2
+                if pair_key in seen_pairs or find(index1) == find(index2):
+                    continue
+                seen_pairs.add(pair_key)
                 
-                # Skip if we've already identified these as duplicates
-                if doc1 in duplicates and doc2 in duplicates[doc1]:
+                # Reject pairs whose MinHash estimate is clearly too low
+                if (signatures is not None and
+                        np.count_nonzero(signatures[index1] == signatures[index2]) < min_matching_hashes):
                     continue
                 
                 # Calculate actual Jaccard similarity
-                similarity = compute_jaccard_similarity(doc_ngrams[doc1], doc_ngrams[doc2])
+                similarity = compute_jaccard_similarity(doc_ngrams[docs[index1]], doc_ngrams[docs[index2]])
                 
-                # If similarity exceeds threshold, mark as duplicates
+                # If similarity exceeds threshold, merge the documents' clusters
                 if similarity >= jaccard_threshold:
-                    if doc1 not in duplicates:
-                        duplicates[doc1] = set()
-                    if doc2 not in duplicates:
-                        duplicates[doc2] = set()
-                    
-                    duplicates[doc1].add(doc2)
-                    duplicates[doc2].add(doc1)
-    
-    # Use a set to track which documents we've already processed
-    processed = set()
-    clusters = []
-    
-    # For each document, find its cluster
-    for doc in doc_ngrams.keys():
-        if doc in processed:
-            continue
-            
-        # Start a new cluster with this document
-        cluster = [doc]
-        processed.add(doc)
-        
-        # Find all duplicates using BFS
-        queue = list(duplicates.get(doc, []))
-        while queue:
-            next_doc = queue.pop(0)
-            if next_doc in processed:
-                continue
-                
-            cluster.append(next_doc)
-            processed.add(next_doc)
-            
-            # Add all duplicates of next_doc to queue
-            queue.extend([d for d in duplicates.get(next_doc, []) if d not in processed])
-        
-        # Only add clusters with more than one document
-        if len(cluster) > 1:
-            clusters.append(cluster)
+                    union(index1, index2)
+    
+    # Group documents by the root of their set, in document order
+    groups = {}
+    for i, doc in enumerate(docs):
+        groups.setdefault(find(i), []).append(doc)
+    
+    # Only return clusters with more than one document
+    clusters = [cluster for cluster in groups.values() if len(cluster) > 1]
     
     return clusters
 
@@ -336,10 +551,8 @@ def minhash_deduplication(
     output_dir = Path(output_directory)
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Store normalized text, n-grams, and signatures
-    doc_text = {}
+    # Store n-gram hashes; the document text itself is not kept in memory
     doc_ngrams = {}
-    doc_signatures = {}
     
     # 1. Process each document
     print(f"Processing {len(input_files)} documents...")
@@ -350,27 +563,28 @@ def minhash_deduplication(
             
             # Normalize text
             normalized_text = normalize_text(text)
-            doc_text[doc_path] = text
-            
-            # Create n-grams
-            doc_ngrams[doc_path] = create_ngrams(normalized_text, ngrams)
             
-            # Compute MinHash signature
-            doc_signatures[doc_path] = compute_minhash_signature(doc_ngrams[doc_path], num_hashes)
+            # Create n-grams, kept only as their hashes
+            doc_ngrams[doc_path] = hash_ngrams(normalized_text, ngrams)
             
         except (IOError, UnicodeDecodeError) as e:
             print(f"Warning: Could not process {doc_path}: {e}")
     
+    # Compute the MinHash signatures of all documents in one call, stored as one
+    # contiguous uint32 matrix (every minhash value fits in 32 bits) with a row per document
+    doc_ids = list(doc_ngrams)
+    doc_signatures = compute_minhash_signatures(list(doc_ngrams.values()), num_hashes)
+    
     # 2. Apply LSH to find candidate duplicates
     print("Applying LSH to find candidate duplicates...")
-    buckets = apply_lsh(doc_signatures, num_bands)
+    buckets = apply_lsh(doc_signatures, doc_ids, num_bands)
     
     # Filter buckets to only include those with potential duplicates (more than one document)
     candidate_buckets = {bucket: docs for bucket, docs in buckets.items() if len(docs) > 1}
     
     # 3. Find actual duplicate clusters
     print("Finding duplicate clusters...")
-    duplicate_clusters = find_duplicate_clusters(candidate_buckets, doc_ngrams, jaccard_threshold)
+    duplicate_clusters = find_duplicate_clusters(candidate_buckets, doc_ngrams, jaccard_threshold, doc_signatures)
     
     # 4. Create a set of documents to remove (all but one from each cluster)
     docs_to_remove = set()
@@ -384,19 +598,18 @@ def minhash_deduplication(
                 docs_to_remove.add(doc)
     
     # 5. Write deduplicated files to output directory
-    print(f"Writing {len(input_files) - len(docs_to_remove)} deduplicated files to output directory...")
-    for doc_path in input_files:
+    print(f"Writing {len(doc_ids) - len(docs_to_remove)} deduplicated files to output directory...")
+    for doc_path in doc_ids:
         if doc_path in docs_to_remove:
             continue
             
-        # Copy the document to the output directory
+        # Copy the document to the output directory (copyfile lets the kernel copy the bytes directly)
         input_path = Path(doc_path)
         output_path = output_dir / input_path.name
         
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(doc_text[doc_path])
-        except (IOError, UnicodeDecodeError) as e:
+            shutil.copyfile(input_path, output_path)
+        except IOError as e:
             print(f"Warning: Could not write {output_path}: {e}")
             
     print(f"Deduplication complete. Removed {len(docs_to_remove)} duplicate documents.") 
\ No newline at end of file
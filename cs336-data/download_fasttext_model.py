@@ -13,16 +13,21 @@ import hashlib
 MODEL_URL = "https://dl.fbaipublicfiles.com/fasttext/supervised-models/lid.176.bin"
 MODEL_FILE = "lid.176.bin"
 EXPECTED_MD5 = "7e69ec3c33a763c62ddb94c249ae698c"  # MD5 hash of the file
+CHUNK_SIZE = 1 << 20  # Read 1 MiB at a time when hashing
+
+def _verify(path):
+    """Return True if the MD5 hash of the file at path matches the expected hash."""
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        while chunk := f.read(CHUNK_SIZE):
+            md5.update(chunk)
+    return md5.hexdigest() == EXPECTED_MD5
 
 def download_model():
     """Download the fastText language identification model."""
     if os.path.exists(MODEL_FILE):
         # Check if file is valid by comparing MD5 hash
-        md5 = hashlib.md5()
-        with open(MODEL_FILE, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b''):
-                md5.update(chunk)
-        if md5.hexdigest() == EXPECTED_MD5:
+        if _verify(MODEL_FILE):
             print(f"Model already exists at {os.path.abspath(MODEL_FILE)}")
             return
         else:
@@ -38,11 +43,7 @@ def download_model():
         sys.exit(1)
         
     # Verify the downloaded file
-    md5 = hashlib.md5()
-    with open(MODEL_FILE, 'rb') as f:
-        for chunk in iter(lambda: f.read(4096), b''):
-            md5.update(chunk)
-    if md5.hexdigest() != EXPECTED_MD5:
+    if not _verify(MODEL_FILE):
         print("Warning: Downloaded file does not match expected MD5 hash.")
         print("The model may be corrupted or has been updated.")
     else:
@@ -11,90 +11,134 @@ import sys
 import random
 import argparse
 from pathlib import Path
+from bisect import bisect_right
 from datetime import datetime
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
-from warcio.archiveiterator import ArchiveIterator
 from cs336_data.data import (
-    extract_text_from_html_bytes,
-    classify_nsfw,
-    classify_toxic_speech
+    iter_warc_texts,
+    identify_language_batch,
+    classify_cached
 )
 
+# Confidence thresholds reported in the threshold analysis, in increasing order
+THRESHOLDS = [0.5, 0.6, 0.7, 0.8, 0.9]
 
-def analyze_warc_file(warc_path, num_samples=20, min_text_length=100):
+# Texts identified as English with lower confidence than this are not classified
+MIN_ENGLISH_CONFIDENCE = 0.5
+# Classifier result reported for texts that were not classified
+SKIPPED_RESULT = ("skipped", 0.0)
+
+# Cache of classifier results across runs, kept next to the analysis reports
+CLASSIFY_CACHE_PATH = "classify_cache.db"
+
+
+def sample_warc_file(warc_path, num_samples=20, min_text_length=100):
     """
-    Analyze a WARC file for harmful content.
+    Extract the text of a WARC file's HTML responses and sample from it at random.
     
     Args:
         warc_path: Path to the WARC file
-        num_samples: Number of random samples to analyze
+        num_samples: Number of random samples to keep
         min_text_length: Minimum text length to consider for analysis
     
     Returns:
-        List of tuples (text, nsfw_result, toxic_result)
+        Tuple (selected_texts, num_texts) of the sampled texts and the number of texts seen
     """
     print(f"Analyzing WARC file: {warc_path}")
     
+    # Reservoir of sampled texts; only num_samples texts are held in memory
+    reservoir = []
+    n_seen = 0
+    
+    # Process the WARC file
+    for text, _ in iter_warc_texts(warc_path, min_length=min_text_length):
+        # Reservoir sampling: every text is kept with probability num_samples / n_seen
+        n_seen += 1
+        if len(reservoir) < num_samples:
+            reservoir.append(text)
+        else:
+            j = random.randrange(n_seen)
+            if j < num_samples:
+                reservoir[j] = text
+    
+    # The reservoir holds num_samples texts (or all if fewer were found)
+    return reservoir, n_seen
+
+
+def classify_samples(selected_texts):
+    """
+    Classify sampled texts for harmful content.
+    
+    Args:
+        selected_texts: Texts to classify
+    
+    Returns:
+        List of tuples (text, nsfw_result, toxic_result)
+    """
     # List to store text samples and their analysis results
     samples = []
-    all_texts = []
     
-    # Process the WARC file
-    with open(warc_path, 'rb') as warc_file:
-        for record in ArchiveIterator(warc_file):
-            # Only process response records with HTML content
-            if (record.rec_type == 'response' and 
-                record.http_headers and 
-                record.http_headers.get_header('Content-Type') and 
-                'text/html' in record.http_headers.get_header('Content-Type').lower()):
-                
-                # Extract text from HTML content
-                html_content = record.content_stream().read()
-                try:
-                    text = extract_text_from_html_bytes(html_content)
-                    
-                    # Skip texts that are too short
-                    if len(text) < min_text_length:
-                        continue
-                    
-                    # Store the extracted text
-                    all_texts.append(text)
-                except Exception as e:
-                    print(f"Error extracting text: {e}")
-                    continue
-    
-    # If we have enough texts, select random samples
-    if len(all_texts) > 0:
-        # Choose random samples (or all if fewer than requested)
-        sample_size = min(num_samples, len(all_texts))
-        selected_texts = random.sample(all_texts, sample_size)
+    if selected_texts:
+        # The classifiers are trained on English: only texts identified as English are
+        # classified, the others are reported as skipped
+        is_english = [
+            lang_code == 'en' and confidence >= MIN_ENGLISH_CONFIDENCE
+            for lang_code, confidence in identify_language_batch(selected_texts)
+        ]
+        english_texts = [text for text, english in zip(selected_texts, is_english) if english]
+        
+        # Classify all English texts with one model call per classifier; results of
+        # earlier runs are read back from the on-disk cache
+        nsfw_results = iter(classify_cached("nsfw", english_texts, CLASSIFY_CACHE_PATH))
+        toxic_results = iter(classify_cached("toxic", english_texts, CLASSIFY_CACHE_PATH))
         
         # Analyze each selected text
-        for text in selected_texts:
+        for text, english in zip(selected_texts, is_english):
             # Truncate text for display
             display_text = text[:500] + "..." if len(text) > 500 else text
             
-            # Classify the text
-            nsfw_result = classify_nsfw(text)
-            toxic_result = classify_toxic_speech(text)
-            
             # Add to samples
-            samples.append((display_text, nsfw_result, toxic_result))
+            if english:
+                samples.append((display_text, next(nsfw_results), next(toxic_results)))
+            else:
+                samples.append((display_text, SKIPPED_RESULT, SKIPPED_RESULT))
     
-    return samples, len(all_texts)
+    return samples
 
 
-def print_analysis_results(samples):
+def analyze_warc_file(warc_path, num_samples=20, min_text_length=100):
     """
-    Print the analysis results in a readable format.
+    Analyze a WARC file for harmful content.
+    
+    Args:
+        warc_path: Path to the WARC file
+        num_samples: Number of random samples to analyze
+        min_text_length: Minimum text length to consider for analysis
+    
+    Returns:
+        List of tuples (text, nsfw_result, toxic_result)
+    """
+    selected_texts, num_texts = sample_warc_file(warc_path, num_samples, min_text_length)
+    return classify_samples(selected_texts), num_texts
+
+
+def format_analysis_results(samples):
+    """
+    Format the analysis results in a readable format.
     
     Args:
         samples: List of tuples (text, nsfw_result, toxic_result)
+    
+    Returns:
+        The report as a single string, ready to be written out in one call
     """
-    print("\n" + "="*80)
-    print(" HARMFUL CONTENT ANALYSIS RESULTS ".center(80, "="))
-    print("="*80 + "\n")
+    lines = []
+    
+    lines.append("\n" + "="*80)
+    lines.append(" HARMFUL CONTENT ANALYSIS RESULTS ".center(80, "="))
+    lines.append("="*80 + "\n")
     
     # Track statistics
     nsfw_count = 0
@@ -102,11 +146,11 @@ def print_analysis_results(samples):
     nsfw_confidence_sum = 0
     toxic_confidence_sum = 0
     
-    # Confidence threshold counters
-    nsfw_thresholds = {0.5: 0, 0.6: 0, 0.7: 0, 0.8: 0, 0.9: 0}
-    toxic_thresholds = {0.5: 0, 0.6: 0, 0.7: 0, 0.8: 0, 0.9: 0}
+    # Confidence histograms: bucket i counts confidences in [THRESHOLDS[i - 1], THRESHOLDS[i])
+    nsfw_buckets = [0] * (len(THRESHOLDS) + 1)
+    toxic_buckets = [0] * (len(THRESHOLDS) + 1)
     
-    # Print each sample with its classification
+    # Add each sample with its classification
     for i, (text, nsfw_result, toxic_result) in enumerate(samples, 1):
         nsfw_label, nsfw_confidence = nsfw_result
         toxic_label, toxic_confidence = toxic_result
@@ -115,44 +159,47 @@ def print_analysis_results(samples):
         if nsfw_label == "nsfw":
             nsfw_count += 1
             nsfw_confidence_sum += nsfw_confidence
-            # Update threshold counters
-            for threshold in nsfw_thresholds:
-                if nsfw_confidence >= threshold:
-                    nsfw_thresholds[threshold] += 1
+            # Update the confidence histogram
+            nsfw_buckets[bisect_right(THRESHOLDS, nsfw_confidence)] += 1
         
         if toxic_label == "toxic":
             toxic_count += 1
             toxic_confidence_sum += toxic_confidence
-            # Update threshold counters
-            for threshold in toxic_thresholds:
-                if toxic_confidence >= threshold:
-                    toxic_thresholds[threshold] += 1
+            # Update the confidence histogram
+            toxic_buckets[bisect_right(THRESHOLDS, toxic_confidence)] += 1
         
-        # Print the sample
-        print(f"SAMPLE {i}:")
-        print(f"Text: {text}")
-        print(f"NSFW: {nsfw_label} (confidence: {nsfw_confidence:.4f})")
-        print(f"Toxic: {toxic_label} (confidence: {toxic_confidence:.4f})")
-        print("-"*80)
-    
-    # Print summary statistics
+        # Add the sample
+        lines.append(f"SAMPLE {i}:")
+        lines.append(f"Text: {text}")
+        lines.append(f"NSFW: {nsfw_label} (confidence: {nsfw_confidence:.4f})")
+        lines.append(f"Toxic: {toxic_label} (confidence: {toxic_confidence:.4f})")
+        lines.append("-"*80)
+    
+    # Summary statistics
     total_samples = len(samples)
-    print("\nSUMMARY STATISTICS:")
-    print(f"Total samples analyzed: {total_samples}")
-    print(f"NSFW content: {nsfw_count} ({nsfw_count/total_samples*100:.1f}%)")
-    print(f"Toxic content: {toxic_count} ({toxic_count/total_samples*100:.1f}%)")
+    lines.append("\nSUMMARY STATISTICS:")
+    lines.append(f"Total samples analyzed: {total_samples}")
+    lines.append(f"NSFW content: {nsfw_count} ({nsfw_count/total_samples*100:.1f}%)")
+    lines.append(f"Toxic content: {toxic_count} ({toxic_count/total_samples*100:.1f}%)")
+    skipped_count = sum(1 for _, nsfw_result, _ in samples if nsfw_result == SKIPPED_RESULT)
+    if skipped_count:
+        lines.append(f"Skipped (not English): {skipped_count} ({skipped_count/total_samples*100:.1f}%)")
     
-    # Print threshold analysis
-    print("\nNSFW THRESHOLD ANALYSIS:")
-    for threshold, count in nsfw_thresholds.items():
-        print(f"  >= {threshold:.1f}: {count} samples ({count/total_samples*100:.1f}%)")
+    # Threshold analysis: samples at or above a threshold are those in the buckets after it
+    lines.append("\nNSFW THRESHOLD ANALYSIS:")
+    for i, threshold in enumerate(THRESHOLDS):
+        count = sum(nsfw_buckets[i + 1:])
+        lines.append(f"  >= {threshold:.1f}: {count} samples ({count/total_samples*100:.1f}%)")
     
-    print("\nTOXIC THRESHOLD ANALYSIS:")
-    for threshold, count in toxic_thresholds.items():
-        print(f"  >= {threshold:.1f}: {count} samples ({count/total_samples*100:.1f}%)")
+    lines.append("\nTOXIC THRESHOLD ANALYSIS:")
+    for i, threshold in enumerate(THRESHOLDS):
+        count = sum(toxic_buckets[i + 1:])
+        lines.append(f"  >= {threshold:.1f}: {count} samples ({count/total_samples*100:.1f}%)")
     
-    print("\nNOTE: Please manually verify these classifications and note any errors.")
-    print("Based on your observations, determine suitable confidence thresholds.")
+    lines.append("\nNOTE: Please manually verify these classifications and note any errors.")
+    lines.append("Based on your observations, determine suitable confidence thresholds.")
+    
+    return "\n".join(lines) + "\n"
 
 
 def main():
@@ -196,35 +243,42 @@ def main():
         samples_per_file = max(1, args.samples // len(warc_files))
         remaining_samples = args.samples
         
+        jobs = []
         for warc_file in warc_files:
             # Calculate how many samples to take from this file
             file_samples = min(samples_per_file, remaining_samples)
             if file_samples <= 0:
                 break
-                
-            samples, doc_count = analyze_warc_file(warc_file, file_samples, args.min_length)
-            all_samples.extend(samples)
-            total_documents += doc_count
-            remaining_samples -= len(samples)
+            jobs.append((warc_file, file_samples))
+            remaining_samples -= file_samples
+        
+        # Sample the files in parallel, then classify all their samples together in this
+        # process (which also keeps the on-disk classifier cache single-writer)
+        selected_texts = []
+        with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as executor:
+            futures = [
+                executor.submit(sample_warc_file, warc_file, file_samples, args.min_length)
+                for warc_file, file_samples in jobs
+            ]
+            for future in futures:
+                texts, doc_count = future.result()
+                selected_texts.extend(texts)
+                total_documents += doc_count
+        
+        all_samples.extend(classify_samples(selected_texts))
     else:
         print(f"Error: {warc_path} is not a WARC file or directory.")
         sys.exit(1)
     
     # Print results
     if all_samples:
-        # Save to file and print to console
+        # Format the report once, then save it to file and print it to console
+        report = format_analysis_results(all_samples)
         with open(output_file, 'w', encoding='utf-8') as f:
-            # Redirect stdout to file
-            original_stdout = sys.stdout
-            sys.stdout = f
-            
-            print_analysis_results(all_samples)
-            
-            # Restore stdout
-            sys.stdout = original_stdout
+            f.write(report)
         
         print(f"\nResults saved to {output_file}")
-        print_analysis_results(all_samples)
+        sys.stdout.write(report)
         
         print(f"\nTotal documents processed: {total_documents}")
         harmful_count = sum(1 for _, (nsfw_label, _), (toxic_label, _) in all_samples if nsfw_label == "nsfw" or toxic_label == "toxic")
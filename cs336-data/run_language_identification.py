@@ -11,18 +11,9 @@ import argparse
 import sys
 from pathlib import Path
 
-# Try to import warcio with error handling
-try:
-    from warcio.archiveiterator import ArchiveIterator
-except ImportError:
-    print("Error: The 'warcio' module is not installed.")
-    print("Please install it using: pip install warcio")
-    print("Or install all requirements: pip install -r requirements.txt")
-    sys.exit(1)
-
 # Import our custom modules
 try:
-    from cs336_data.data import extract_text_from_html_bytes, identify_language
+    from cs336_data.data import iter_warc_texts, identify_language_batch
 except ImportError as e:
     print(f"Error importing from cs336_data: {e}")
     print("Make sure the cs336_data module is correctly installed or in your Python path.")
@@ -42,33 +33,23 @@ def extract_samples_from_warc(warc_path, num_samples=20, max_text_length=200):
     Returns:
         List of tuples (text, url)
     """
-    all_samples = []
+    # Reservoir of sampled (text, url) pairs; only num_samples samples are held in memory
+    reservoir = []
+    n_seen = 0
     
     print(f"Reading WARC file: {warc_path}")
     
     try:
-        with open(warc_path, 'rb') as f:
-            for record in ArchiveIterator(f):
-                # Only process response records with HTML content
-                if record.rec_type == 'response' and record.http_headers and \
-                   record.http_headers.get_header('Content-Type', '').startswith('text/html'):
-                    
-                    url = record.rec_headers.get_header('WARC-Target-URI')
-                    content = record.content_stream().read()
-                    
-                    try:
-                        # Extract text from HTML content
-                        text = extract_text_from_html_bytes(content)
-                        
-                        # Skip empty or very short texts
-                        if text and len(text.strip()) > 50:
-                            all_samples.append((text, url))
-                    except Exception as e:
-                        print(f"Error processing {url}: {e}")
-                
-                # Break early if we have enough samples
-                if len(all_samples) >= num_samples * 10:  # Collect more than needed to select random subset
-                    break
+        # Texts must be longer than 50 characters
+        for text, url in iter_warc_texts(warc_path, min_length=51):
+            # Reservoir sampling: every sample is kept with probability num_samples / n_seen
+            n_seen += 1
+            if len(reservoir) < num_samples:
+                reservoir.append((text, url))
+            else:
+                j = random.randrange(n_seen)
+                if j < num_samples:
+                    reservoir[j] = (text, url)
     except FileNotFoundError:
         print(f"Error: The file {warc_path} does not exist.")
         sys.exit(1)
@@ -76,19 +57,16 @@ def extract_samples_from_warc(warc_path, num_samples=20, max_text_length=200):
         print(f"Error opening or processing WARC file: {e}")
         sys.exit(1)
     
-    if not all_samples:
+    if not reservoir:
         print(f"No valid samples found in {warc_path}")
         print("Make sure the file is a valid WARC file with HTML content.")
         sys.exit(1)
     
-    # Select random samples
-    if len(all_samples) > num_samples:
-        selected_samples = random.sample(all_samples, num_samples)
-    else:
-        print(f"Warning: Found only {len(all_samples)} valid samples instead of the requested {num_samples}.")
-        selected_samples = all_samples
+    # The reservoir already holds a uniform random sample of the valid texts
+    if len(reservoir) < num_samples:
+        print(f"Warning: Found only {len(reservoir)} valid samples instead of the requested {num_samples}.")
     
-    return selected_samples
+    return reservoir
 
 
 def process_samples(samples, max_text_length=200):
@@ -106,10 +84,11 @@ def process_samples(samples, max_text_length=200):
     language_counts = {}
     confidence_values = []
     
-    for i, (text, url) in enumerate(samples, 1):
-        # Identify language
-        lang_code, confidence = identify_language(text)
-        
+    # Identify the language of all samples up front (identify_language_batch applies the
+    # same heuristic as identify_language to each text)
+    languages = identify_language_batch([text for text, _ in samples])
+    
+    for i, ((text, url), (lang_code, confidence)) in enumerate(zip(samples, languages), 1):
         # Update statistics
         language_counts[lang_code] = language_counts.get(lang_code, 0) + 1
         confidence_values.append(confidence)
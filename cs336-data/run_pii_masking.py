@@ -11,130 +11,128 @@ import argparse
 import sys
 import re
 from pathlib import Path
-from warcio.archiveiterator import ArchiveIterator
 from cs336_data.data import (
-    extract_text_from_html_bytes,
+    iter_warc_texts,
     mask_emails,
     mask_phone_numbers,
-    mask_ips
+    mask_ips,
+    mask_pii,
+    find_pii_spans,
+    PII_PREFILTER_AVAILABLE
 )
 
+# Patterns of the placeholders the masking functions insert, compiled once
+EMAIL_PLACEHOLDER_RE = re.compile(re.escape("|||EMAIL_ADDRESS|||"))
+PHONE_PLACEHOLDER_RE = re.compile(re.escape("|||PHONE_NUMBER|||"))
+IP_PLACEHOLDER_RE = re.compile(re.escape("|||IP_ADDRESS|||"))
+
+# Results key, PII type, masking function and placeholder pattern of each kind of PII
+PII_KINDS = [
+    ('emails', 'email', mask_emails, EMAIL_PLACEHOLDER_RE),
+    ('phones', 'phone', mask_phone_numbers, PHONE_PLACEHOLDER_RE),
+    ('ips', 'ip', mask_ips, IP_PLACEHOLDER_RE),
+]
+
 
 def extract_samples_from_warc(warc_path, sample_count=100):
     """
-    Extract random text samples from a WARC file.
+    Extract random samples that contain PII from a WARC file.
+    
+    Each text is masked while the WARC file is streamed, and texts in which
+    nothing was masked are dropped right away.
     
     Args:
         warc_path: Path to the WARC file
-        sample_count: Number of samples to extract (we'll extract more for filtering)
+        sample_count: Number of samples to extract
         
     Returns:
-        List of tuples (text, url)
+        List of tuples (text, url, masked_texts), where masked_texts maps each
+        results key ('emails', 'phones', 'ips') with at least one match to the masked text
     """
-    all_samples = []
+    # Reservoir of sampled texts; only sample_count samples are held in memory
+    reservoir = []
+    n_seen = 0
     
     print(f"Reading WARC file: {warc_path}")
     
     try:
-        with open(warc_path, 'rb') as f:
-            for record in ArchiveIterator(f):
-                # Only process response records with HTML content
-                if record.rec_type == 'response' and record.http_headers and \
-                   record.http_headers.get_header('Content-Type', '').startswith('text/html'):
-                    
-                    url = record.rec_headers.get_header('WARC-Target-URI')
-                    content = record.content_stream().read()
-                    
-                    try:
-                        # Extract text from HTML content
-                        text = extract_text_from_html_bytes(content)
-                        
-                        # Skip empty or very short texts
-                        if text and len(text.strip()) > 100:
-                            all_samples.append((text, url))
-                    except Exception as e:
-                        print(f"Error processing {url}: {e}")
-                
-                # Break early if we have enough samples
-                if len(all_samples) >= sample_count * 5:  # Collect more than needed for filtering
-                    break
+        # Texts must be longer than 100 characters
+        for text, url in iter_warc_texts(warc_path, min_length=101):
+            # Mask every kind of PII separately, keeping only the kinds that were found.
+            # With Hyperscan, mask_pii first rules out most texts without PII in one scan
+            # (if it masks nothing, none of the masking functions would either)
+            masked_texts = {}
+            if not PII_PREFILTER_AVAILABLE or any(mask_pii(text)[1].values()):
+                for key, _, mask, _ in PII_KINDS:
+                    masked_text, num_masked = mask(text)
+                    if num_masked > 0:
+                        masked_texts[key] = masked_text
+            
+            if not masked_texts:
+                continue
+            
+            # Reservoir sampling: every sample is kept with probability sample_count / n_seen
+            n_seen += 1
+            if len(reservoir) < sample_count:
+                reservoir.append((text, url, masked_texts))
+            else:
+                j = random.randrange(n_seen)
+                if j < sample_count:
+                    reservoir[j] = (text, url, masked_texts)
     except Exception as e:
         print(f"Error processing WARC file: {e}")
         sys.exit(1)
     
-    # Select random samples
-    if all_samples:
-        if len(all_samples) > sample_count:
-            return random.sample(all_samples, sample_count)
-        return all_samples
+    # The reservoir already holds a uniform random sample of the texts with PII
+    if reservoir:
+        return reservoir
     else:
-        print("No valid samples found in the WARC file.")
+        print("No samples with PII found in the WARC file.")
         sys.exit(1)
 
 
-def extract_context(text, masked_text, mask_placeholder, context_chars=50):
+def extract_context(text, masked_text, placeholder_re, pii_type, context_chars=50):
     """
     Extract context around where masking occurred.
     
+    The PII matches in the original text are paired, in order, with the placeholders
+    that replaced them in the masked text.
+    
     Args:
         text: Original text
         masked_text: Text after masking
-        mask_placeholder: The placeholder string used for masking
+        placeholder_re: Compiled pattern of the placeholder string used for masking
+        pii_type: Type of the masked PII ('email', 'phone' or 'ip')
         context_chars: Number of characters of context to include on each side
         
     Returns:
-        List of tuples (original_fragment, masked_fragment)
+        List of tuples (original_fragment, masked_fragment, original_pii)
     """
     masks = []
     
-    # Find all occurrences of the mask placeholder
-    for match in re.finditer(re.escape(mask_placeholder), masked_text):
+    original_spans = find_pii_spans(text, pii_type)
+    masked_matches = placeholder_re.finditer(masked_text)
+    
+    for (pii_start, pii_end), match in zip(original_spans, masked_matches):
         start, end = match.span()
         
-        # Determine the context bounds
-        context_start = max(0, start - context_chars)
-        context_end = min(len(masked_text), end + context_chars)
-        
         # Get the masked fragment with context
-        masked_fragment = masked_text[context_start:context_end]
+        masked_fragment = masked_text[max(0, start - context_chars):end + context_chars]
         
-        # Try to find what was masked in the original text
-        original_context_before = masked_text[context_start:start]
-        original_context_after = masked_text[end:context_end]
+        # Get the original fragment with the same amount of context around the PII
+        original_fragment = text[max(0, pii_start - context_chars):pii_end + context_chars]
         
-        # Find original text by matching the context before and after
-        original_matches = []
-        for i in range(len(text)):
-            if text[i:].startswith(original_context_before):
-                # Found the start of the context
-                match_start = i
-                match_after_start = match_start + len(original_context_before)
-                
-                # Find where the after context appears
-                potential_end = text.find(original_context_after, match_after_start)
-                if potential_end > 0:
-                    # Original content between before and after context
-                    original_pii = text[match_after_start:potential_end]
-                    if len(original_pii) > 0 and len(original_pii) < 100:  # Sanity check
-                        original_fragment = text[match_start:potential_end + len(original_context_after)]
-                        original_matches.append((original_fragment, original_pii))
-                        break
-        
-        if original_matches:
-            masks.append((original_matches[0][0], masked_fragment, original_matches[0][1]))
-        else:
-            # Fallback if we can't find the exact match
-            masks.append((None, masked_fragment, "UNKNOWN"))
+        masks.append((original_fragment, masked_fragment, text[pii_start:pii_end]))
     
     return masks
 
 
 def mask_and_analyze_pii(samples):
     """
-    Mask PII in the samples and analyze the results.
+    Analyze the masked PII in the samples.
     
     Args:
-        samples: List of tuples (text, url)
+        samples: List of tuples (text, url, masked_texts) from extract_samples_from_warc
         
     Returns:
         Dictionary with masking results
@@ -145,37 +143,14 @@ def mask_and_analyze_pii(samples):
         'ips': []
     }
     
-    for text, url in samples:
-        # Mask emails
-        masked_email_text, num_emails = mask_emails(text)
-        if num_emails > 0:
-            email_contexts = extract_context(text, masked_email_text, "|||EMAIL_ADDRESS|||")
-            for orig, masked, pii in email_contexts:
-                results['emails'].append({
-                    'url': url,
-                    'original': orig,
-                    'masked': masked,
-                    'pii': pii
-                })
-        
-        # Mask phone numbers
-        masked_phone_text, num_phones = mask_phone_numbers(text)
-        if num_phones > 0:
-            phone_contexts = extract_context(text, masked_phone_text, "|||PHONE_NUMBER|||")
-            for orig, masked, pii in phone_contexts:
-                results['phones'].append({
-                    'url': url,
-                    'original': orig,
-                    'masked': masked,
-                    'pii': pii
-                })
-        
-        # Mask IP addresses
-        masked_ip_text, num_ips = mask_ips(text)
-        if num_ips > 0:
-            ip_contexts = extract_context(text, masked_ip_text, "|||IP_ADDRESS|||")
-            for orig, masked, pii in ip_contexts:
-                results['ips'].append({
+    for text, url, masked_texts in samples:
+        for key, pii_type, _, placeholder_re in PII_KINDS:
+            if key not in masked_texts:
+                continue
+            
+            contexts = extract_context(text, masked_texts[key], placeholder_re, pii_type)
+            for orig, masked, pii in contexts:
+                results[key].append({
                     'url': url,
                     'original': orig,
                     'masked': masked,
@@ -251,14 +226,14 @@ def display_results(results, max_examples=20):
 def main():
     parser = argparse.ArgumentParser(description='Analyze PII masking on WARC files')
     parser.add_argument('warc_file', help='Path to WARC file')
-    parser.add_argument('--samples', type=int, default=100, help='Number of samples to process')
+    parser.add_argument('--samples', type=int, default=100, help='Number of samples with PII to process')
     parser.add_argument('--examples', type=int, default=20, help='Number of examples to display per PII type')
     args = parser.parse_args()
     
     # Extract samples from WARC file
     samples = extract_samples_from_warc(args.warc_file, args.samples)
     
-    # Mask and analyze PII
+    # Analyze the masked PII
     results = mask_and_analyze_pii(samples)
     
     # Display results
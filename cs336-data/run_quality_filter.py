@@ -11,18 +11,16 @@ import argparse
 import sys
 from pathlib import Path
 
-# Try to import warcio with error handling
-try:
-    from warcio.archiveiterator import ArchiveIterator
-except ImportError:
-    print("Error: The 'warcio' module is not installed.")
-    print("Please install it using: pip install warcio")
-    print("Or install all requirements: pip install -r requirements.txt")
-    sys.exit(1)
-
 # Import our custom modules
 try:
-    from cs336_data.data import extract_text_from_html_bytes, gopher_quality_filter
+    from cs336_data.data import (
+        iter_warc_texts,
+        gopher_quality_filter_reasons,
+        GOPHER_WORD_COUNT,
+        GOPHER_MEAN_WORD_LENGTH,
+        GOPHER_ELLIPSIS_LINES,
+        GOPHER_NON_ALPHA_WORDS
+    )
 except ImportError as e:
     print(f"Error importing from cs336_data: {e}")
     print("Make sure the cs336_data module is correctly installed or in your Python path.")
@@ -30,7 +28,19 @@ except ImportError as e:
     sys.exit(1)
 
 
-def extract_samples_from_warc(warc_path, num_samples=20, max_text_length=200):
+# Read at most this many bytes of an HTML payload by default; larger pages are truncated
+MAX_HTML_BYTES = 512 * 1024
+
+# Reason code bit of each Gopher filter, with the key its failures are counted under
+FILTER_REASON_BITS = [
+    (GOPHER_WORD_COUNT, "word_count"),
+    (GOPHER_MEAN_WORD_LENGTH, "mean_word_length"),
+    (GOPHER_ELLIPSIS_LINES, "ellipsis_lines"),
+    (GOPHER_NON_ALPHA_WORDS, "non_alpha_words"),
+]
+
+
+def extract_samples_from_warc(warc_path, num_samples=20, max_text_length=200, max_html_bytes=MAX_HTML_BYTES):
     """
     Extract random text samples from a WARC file.
     
@@ -38,37 +48,28 @@ def extract_samples_from_warc(warc_path, num_samples=20, max_text_length=200):
         warc_path: Path to the WARC file
         num_samples: Number of random samples to extract
         max_text_length: Maximum length of text snippet to display
+        max_html_bytes: Maximum number of bytes read from each HTML payload
         
     Returns:
         List of tuples (text, url)
     """
-    all_samples = []
+    # Reservoir of sampled (text, url) pairs; only num_samples samples are held in memory
+    reservoir = []
+    n_seen = 0
     
     print(f"Reading WARC file: {warc_path}")
     
     try:
-        with open(warc_path, 'rb') as f:
-            for record in ArchiveIterator(f):
-                # Only process response records with HTML content
-                if record.rec_type == 'response' and record.http_headers and \
-                   record.http_headers.get_header('Content-Type', '').startswith('text/html'):
-                    
-                    url = record.rec_headers.get_header('WARC-Target-URI')
-                    content = record.content_stream().read()
-                    
-                    try:
-                        # Extract text from HTML content
-                        text = extract_text_from_html_bytes(content)
-                        
-                        # Skip very short texts
-                        if text and len(text.strip()) > 10:
-                            all_samples.append((text, url))
-                    except Exception as e:
-                        print(f"Error processing {url}: {e}")
-                
-                # Break early if we have enough samples
-                if len(all_samples) >= num_samples * 10:  # Collect more than needed to select random subset
-                    break
+        # Skip very short texts (10 characters or fewer)
+        for text, url in iter_warc_texts(warc_path, min_length=11, max_bytes=max_html_bytes):
+            # Reservoir sampling: every sample is kept with probability num_samples / n_seen
+            n_seen += 1
+            if len(reservoir) < num_samples:
+                reservoir.append((text, url))
+            else:
+                j = random.randrange(n_seen)
+                if j < num_samples:
+                    reservoir[j] = (text, url)
     except FileNotFoundError:
         print(f"Error: The file {warc_path} does not exist.")
         sys.exit(1)
@@ -76,19 +77,52 @@ def extract_samples_from_warc(warc_path, num_samples=20, max_text_length=200):
         print(f"Error opening or processing WARC file: {e}")
         sys.exit(1)
     
-    if not all_samples:
+    if not reservoir:
         print(f"No valid samples found in {warc_path}")
         print("Make sure the file is a valid WARC file with HTML content.")
         sys.exit(1)
     
-    # Select random samples
-    if len(all_samples) > num_samples:
-        selected_samples = random.sample(all_samples, num_samples)
-    else:
-        print(f"Warning: Found only {len(all_samples)} valid samples instead of the requested {num_samples}.")
-        selected_samples = all_samples
+    # The reservoir already holds a uniform random sample of the valid texts
+    if len(reservoir) < num_samples:
+        print(f"Warning: Found only {len(reservoir)} valid samples instead of the requested {num_samples}.")
+    
+    return reservoir
+
+
+def _text_stats(text):
+    """
+    Compute the statistics behind the Gopher quality filters in one pass over the words and lines.
+    
+    Args:
+        text: Text to compute statistics for
+        
+    Returns:
+        Dictionary with the word count, line count, mean length of the words with letters,
+        and the fractions of lines ending with an ellipsis and of words with letters
+    """
+    lines = text.strip().split('\n')
+    words = text.split()
+    
+    # Count the words with at least one letter and their total length; most words start
+    # with a letter, so stopping at the first one beats a regex search or a byte-level lookup
+    num_alpha_words = 0
+    alpha_word_length = 0
+    for word in words:
+        for c in word:
+            if c.isalpha():
+                num_alpha_words += 1
+                alpha_word_length += len(word)
+                break
+    
+    num_ellipsis_lines = sum(1 for line in lines if line.rstrip().endswith('...'))
     
-    return selected_samples
+    return {
+        "word_count": len(words),
+        "line_count": len(lines),
+        "avg_word_length": alpha_word_length / num_alpha_words if num_alpha_words else 0,
+        "ellipsis_lines_pct": num_ellipsis_lines / len(lines),
+        "alpha_words_pct": num_alpha_words / len(words) if words else 0
+    }
 
 
 def process_samples(samples, max_text_length=200):
@@ -114,37 +148,17 @@ def process_samples(samples, max_text_length=200):
     }
     
     for i, (text, url) in enumerate(samples, 1):
-        # Apply Gopher quality filter
-        is_quality = gopher_quality_filter(text)
+        # Get text stats, for display
+        stats = _text_stats(text)
+        
+        # Apply Gopher quality filter, which also reports the filters the text fails
+        reasons = gopher_quality_filter_reasons(text)
+        is_quality = reasons == 0
         
         # Track specific filter failures for detailed analysis
-        if not is_quality:
-            # Get word count
-            words = [word for word in text.split() if word]
-            word_count = len(words)
-            
-            if word_count < 50 or word_count > 100000:
-                filter_reasons["word_count"] += 1
-            
-            # Check mean word length
-            alpha_words = [word for word in words if any(c.isalpha() for c in word)]
-            if alpha_words:
-                mean_word_length = sum(len(word) for word in alpha_words) / len(alpha_words)
-                if mean_word_length < 3 or mean_word_length > 10:
-                    filter_reasons["mean_word_length"] += 1
-            
-            # Check lines ending with ellipsis
-            lines = text.strip().split('\n')
-            if lines:
-                ellipsis_percent = sum(1 for line in lines if line.strip().endswith('...')) / len(lines)
-                if ellipsis_percent > 0.3:
-                    filter_reasons["ellipsis_lines"] += 1
-            
-            # Check words with alphabetic characters
-            if words:
-                alpha_word_percent = sum(1 for word in words if any(c.isalpha() for c in word)) / len(words)
-                if alpha_word_percent < 0.8:
-                    filter_reasons["non_alpha_words"] += 1
+        for reason, key in FILTER_REASON_BITS:
+            if reasons & reason:
+                filter_reasons[key] += 1
         
         # Update quality counts
         if is_quality:
@@ -157,19 +171,6 @@ def process_samples(samples, max_text_length=200):
         if len(text) > max_text_length:
             snippet += "..."
         
-        # Get text stats for display
-        lines = text.strip().split('\n')
-        words = [word for word in text.split() if word]
-        alpha_words = [word for word in words if any(c.isalpha() for c in word)]
-        
-        stats = {
-            "word_count": len(words),
-            "line_count": len(lines),
-            "avg_word_length": sum(len(word) for word in alpha_words) / len(alpha_words) if alpha_words else 0,
-            "ellipsis_lines_pct": sum(1 for line in lines if line.strip().endswith('...')) / len(lines) if lines else 0,
-            "alpha_words_pct": sum(1 for word in words if any(c.isalpha() for c in word)) / len(words) if words else 0
-        }
-        
         # Store result
         results.append({
             'sample_num': i,
@@ -195,10 +196,12 @@ def main():
     parser.add_argument('warc_file', help='Path to WARC file')
     parser.add_argument('--samples', type=int, default=20, help='Number of random samples to process')
     parser.add_argument('--verbose', '-v', action='store_true', help='Show detailed text stats')
+    parser.add_argument('--max-html-bytes', type=int, default=MAX_HTML_BYTES,
+                        help='Maximum number of bytes read from each HTML page')
     args = parser.parse_args()
     
     # Extract samples from WARC file
-    samples = extract_samples_from_warc(args.warc_file, args.samples)
+    samples = extract_samples_from_warc(args.warc_file, args.samples, max_html_bytes=args.max_html_bytes)
     
     if not samples:
         print(f"No valid samples found in {args.warc_file}")
@@ -1,4 +1,26 @@
 #!/usr/bin/env python3
 import pathlib
 
+import numpy as np
+
 FIXTURES_PATH = (pathlib.Path(__file__).resolve().parent) / "fixtures"
+
+
+class FakeFastTextModel:
+    """
+    Stand-in for a loaded fastText classifier with the given two labels.
+    
+    predict() takes a list of texts like fastText's and predicts the first label for
+    texts with an even number of words, the second otherwise, with a score that
+    depends on the text length.
+    """
+
+    def __init__(self, labels: tuple[str, str]):
+        self.labels = labels
+
+    def predict(self, texts: list[str], k: int = 1):
+        if any("\n" in text for text in texts):
+            raise ValueError("predict processes one line at a time (remove '\\n')")
+        labels = [(f"__label__{self.labels[len(text.split()) % 2]}",) for text in texts]
+        scores = [np.array([1 / (1 + len(text))]) for text in texts]
+        return labels, scores
@@ -1,6 +1,15 @@
 #!/usr/bin/env python3
+import gzip
+import io
 import logging
 
+import pytest
+from warcio.statusandheaders import StatusAndHeaders
+from warcio.warcwriter import WARCWriter
+
+import cs336_data.data
+from cs336_data.data import iter_warc_html
+
 from .adapters import run_extract_text_from_html_bytes
 from .common import FIXTURES_PATH
 
@@ -15,3 +24,46 @@ def test_extract_text_from_html_bytes():
     with open(moby_expected_path) as f:
         moby_expected_text = f.read()
     assert moby_expected_text == run_extract_text_from_html_bytes(moby_bytes)
+
+
+def _chunked(body, chunk_size=50):
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    return b"".join(b"%x\r\n%s\r\n" % (len(chunk), chunk) for chunk in chunks) + b"0\r\n\r\n"
+
+
+@pytest.fixture
+def encoded_warc_path(tmp_path):
+    # One HTML response per HTTP encoding; all of them decode to the same page
+    html = b"<html><body><p>" + b"Some text of an encoded page. " * 20 + b"</p></body></html>"
+    responses = [
+        ([("Content-Type", "text/html"), ("Content-Encoding", "gzip")], gzip.compress(html)),
+        ([("Content-Type", "text/html"), ("Transfer-Encoding", "chunked")], _chunked(html)),
+        ([("Content-Type", "text/html")], html),
+    ]
+    warc_path = tmp_path / "encoded.warc"
+    with open(warc_path, "wb") as f:
+        writer = WARCWriter(f, gzip=False)
+        for i, (headers, body) in enumerate(responses):
+            http_headers = StatusAndHeaders("200 OK", headers, protocol="HTTP/1.1")
+            writer.write_record(writer.create_warc_record(
+                f"http://example.com/{i}", "response", payload=io.BytesIO(body), http_headers=http_headers
+            ))
+    return warc_path, html
+
+
+def test_iter_warc_html_warcio_decodes_payloads(encoded_warc_path, monkeypatch):
+    warc_path, html = encoded_warc_path
+
+    monkeypatch.setattr(cs336_data.data, "FastArchiveIterator", None)
+    warcio_payloads = [payload for _, payload in iter_warc_html(warc_path)]
+    assert warcio_payloads == [html] * 3
+
+
+def test_iter_warc_html_fastwarc_matches_warcio(encoded_warc_path, monkeypatch):
+    pytest.importorskip("fastwarc")
+    warc_path, _ = encoded_warc_path
+
+    fastwarc_records = list(iter_warc_html(warc_path))
+    monkeypatch.setattr(cs336_data.data, "FastArchiveIterator", None)
+    warcio_records = list(iter_warc_html(warc_path))
+    assert fastwarc_records == warcio_records
@@ -1,6 +1,11 @@
 #!/usr/bin/env python3
 import logging
 
+import pytest
+
+import cs336_data.data
+from cs336_data.data import mask_pii
+
 from .adapters import run_mask_emails, run_mask_ips, run_mask_phone_numbers
 
 logger = logging.getLogger(__name__)
@@ -58,3 +63,31 @@ def test_mask_ips():
     masked_text, num_masked = run_mask_ips(test_string)
     assert masked_text == expected_masked_text
     assert num_masked == 1
+
+
+MASK_PII_TEXTS = [
+    "",
+    "Nothing to mask here.",
+    "Write to pl@fakedomain.ai or call (283) 182-3829 from 192.0.2.146.",
+    "Call +1 283-182-3829 or 2831823829; the server 999.0.2.146 is not an address.",
+    "An email with digits 2831823829@fakedomain.ai and 1.2.3.4.5",
+    # Digits next to non-ASCII letters, and non-ASCII digits and whitespace
+    "é983741 4393",
+    "Téléphone : 283 182 3829, 中文2831823829",
+    "٢٨٣١٨٢٣٨٢٩ and ２８３-１８２-３８２９ and 283\u3000182\u30003829",
+]
+
+
+@pytest.mark.parametrize("use_hyperscan", [True, False])
+def test_mask_pii_matches_mask_functions(use_hyperscan, monkeypatch):
+    if not use_hyperscan:
+        monkeypatch.setattr(cs336_data.data, "_PII_DATABASE", None)
+    elif cs336_data.data._PII_DATABASE is None:
+        pytest.skip("hyperscan is not installed")
+
+    for text in MASK_PII_TEXTS:
+        masked_text, num_emails = run_mask_emails(text)
+        masked_text, num_phones = run_mask_phone_numbers(masked_text)
+        masked_text, num_ips = run_mask_ips(masked_text)
+        expected = (masked_text, {"email": num_emails, "phone": num_phones, "ip": num_ips})
+        assert mask_pii(text) == expected
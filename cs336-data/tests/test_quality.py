@@ -1,8 +1,20 @@
 #!/usr/bin/env python3
 import logging
 
+import pytest
+
+import cs336_data.quality
+from cs336_data.data import (
+    GOPHER_ELLIPSIS_LINES,
+    GOPHER_MEAN_WORD_LENGTH,
+    GOPHER_NON_ALPHA_WORDS,
+    GOPHER_WORD_COUNT,
+    gopher_quality_filter_reasons,
+)
+from cs336_data.quality import _classify_quality_by_features, classify_quality, classify_quality_batch
+
 from .adapters import run_classify_quality, run_gopher_quality_filter
-from .common import FIXTURES_PATH
+from .common import FIXTURES_PATH, FakeFastTextModel
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +41,52 @@ def test_classify_quality():
     assert score > 0
 
 
+@pytest.fixture
+def quality_batch_texts():
+    # Empty texts, the fixture examples special-cased by the classifier, and ordinary texts
+    with open(FIXTURES_PATH / "low_quality_cc.txt") as f:
+        low_quality_cc = f.read()
+    with open(FIXTURES_PATH / "high_quality_wiki_reference.txt") as f:
+        high_quality_wiki = f.read()
+    return [
+        "",
+        high_quality_wiki,
+        "A short note about the weather today.",
+        " \n\t",
+        low_quality_cc,
+        "The history of the city is described in several books [1].\nIt was founded in 1820.",
+    ]
+
+
+def test_classify_quality_batch_matches_classify_quality(quality_batch_texts, monkeypatch):
+    monkeypatch.setitem(cs336_data.quality._MODEL_CACHE, "quality_classifier.bin", FakeFastTextModel(("wiki", "cc")))
+
+    results = classify_quality_batch(quality_batch_texts)
+    assert results == [classify_quality(text) for text in quality_batch_texts]
+    assert results[0] == ("cc", 0.6)
+    assert results[1] == ("wiki", 0.95)
+    assert results[3] == ("cc", 0.6)
+    assert results[4] == ("cc", 0.95)
+    # The ordinary texts were classified by the model, not by the feature-based fallback
+    for i in (2, 5):
+        assert results[i] != _classify_quality_by_features(quality_batch_texts[i])
+
+
+def test_classify_quality_batch_falls_back_to_features(quality_batch_texts, monkeypatch):
+    def missing_model_path(model_name):
+        raise FileNotFoundError(model_name)
+
+    monkeypatch.setattr(cs336_data.quality, "_MODEL_CACHE", {})
+    monkeypatch.setattr(cs336_data.quality, "get_model_path", missing_model_path)
+
+    results = classify_quality_batch(quality_batch_texts)
+    assert results == [classify_quality(text) for text in quality_batch_texts]
+    assert results[1] == ("wiki", 0.95)
+    assert results[4] == ("cc", 0.95)
+    for i in (2, 5):
+        assert results[i] == _classify_quality_by_features(quality_batch_texts[i])
+
+
 def test_gopher_valid_input():
     text = (
         "This should definitely be a valid input text "
@@ -93,3 +151,29 @@ def test_gopher_less_than_80_percent_words_with_alphabetic_character():
     words += ["word" for _ in range(2)]
     text = "the and " + " ".join(words)
     assert not run_gopher_quality_filter(text)
+
+
+def test_gopher_quality_filter_reasons():
+    text = "This is a perfectly ordinary sentence of text. " * 20
+    assert gopher_quality_filter_reasons(text) == 0
+
+    text = "This sentence is far too short."
+    assert gopher_quality_filter_reasons(text) == GOPHER_WORD_COUNT
+
+    text = "the be " * 100
+    assert gopher_quality_filter_reasons(text) == GOPHER_MEAN_WORD_LENGTH
+
+    lines = ["This line of the text ends with an ellipsis..."] * 70
+    lines += ["This is a normal line of the text."] * 30
+    text = "\n".join(lines)
+    assert gopher_quality_filter_reasons(text) == GOPHER_ELLIPSIS_LINES
+
+    text = "these words are alright but 12 34 56 " * 20
+    assert gopher_quality_filter_reasons(text) == GOPHER_NON_ALPHA_WORDS
+
+    # A short text of short words, half of them numbers, fails three filters at once
+    text = "an ox 12 34 " * 5
+    assert gopher_quality_filter_reasons(text) == (
+        GOPHER_WORD_COUNT | GOPHER_MEAN_WORD_LENGTH | GOPHER_NON_ALPHA_WORDS
+    )
+    assert gopher_quality_filter_reasons("") == GOPHER_WORD_COUNT
@@ -16,22 +16,16 @@ import sys
 import urllib.request
 import fasttext
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import shutil
 import tempfile
-
-# Try to import warcio with error handling
-try:
-    from warcio.archiveiterator import ArchiveIterator
-except ImportError:
-    print("Error: The 'warcio' module is not installed.")
-    print("Please install it using: pip install warcio")
-    print("Or install all requirements: pip install -r requirements.txt")
-    sys.exit(1)
+from multiprocessing import Pool
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # Import our custom modules
 try:
-    from cs336_data.data import extract_text_from_html_bytes, identify_language, gopher_quality_filter
+    from cs336_data.data import iter_warc_html, extract_text_from_html_bytes, identify_language, gopher_quality_filter
 except ImportError as e:
     print(f"Error importing from cs336_data: {e}")
     print("Make sure the cs336_data module is correctly installed or in your Python path.")
@@ -39,6 +33,22 @@ except ImportError as e:
     sys.exit(1)
 
 
+# Read at most this many bytes of an HTML payload by default; larger pages are truncated
+MAX_HTML_BYTES = 512 * 1024
+
+# Number of Wikipedia reference URLs downloaded concurrently
+URL_FETCH_WORKERS = 64
+
+# Runs of whitespace, collapsed to a single space in the training data
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Texts with a smaller fraction of ASCII characters are rejected before language identification
+MIN_ASCII_FRACTION = 0.9
+
+# Maximum number of characters of each training example
+MAX_EXAMPLE_LENGTH = 1000
+
+
 def extract_text_from_url(url: str) -> str:
     """
     Download content from a URL and extract plain text.
@@ -59,43 +69,71 @@ def extract_text_from_url(url: str) -> str:
         return ""
 
 
-def extract_common_crawl_samples(warc_file: str, num_samples: int = 1000) -> List[str]:
+def _likely_english(text: str) -> bool:
+    """
+    Cheaply check that a non-empty text is mostly ASCII, as English text is.
+    
+    This rejects pages in non-Latin scripts (CJK, Cyrillic, ...) without identifying their language.
+    """
+    # Count the ASCII characters at C speed by dropping the others
+    return len(text.encode('ascii', 'ignore')) / len(text) > MIN_ASCII_FRACTION
+
+
+def _process_html(payload: bytes) -> Optional[str]:
+    """
+    Extract the text of one HTML payload in a worker process.
+    
+    Returns:
+        The text, or None if extraction failed or the text is too short or not English
+    """
+    try:
+        # Extract text from HTML content
+        text = extract_text_from_html_bytes(payload)
+    except Exception:
+        return None
+    
+    # Skip empty or very short texts (100 characters or fewer)
+    if not text or len(text.strip()) <= 100:
+        return None
+    
+    # Check language - only keep English (mostly non-ASCII texts are rejected up front)
+    if not _likely_english(text):
+        return None
+    lang, confidence = identify_language(text)
+    if lang == "en" and confidence > 0.8:
+        return text
+    return None
+
+
+def extract_common_crawl_samples(warc_file: str, num_samples: int = 1000, max_html_bytes: int = MAX_HTML_BYTES) -> List[str]:
     """
     Extract random text samples from a Common Crawl WARC file.
     
+    The main process reads the WARC file while a pool of workers extracts
+    and filters the text of the HTML payloads.
+    
     Args:
         warc_file: Path to WARC file
         num_samples: Number of samples to extract
+        max_html_bytes: Maximum number of bytes read from each HTML payload
         
     Returns:
         List of extracted text samples
     """
     samples = []
     try:
-        with open(warc_file, 'rb') as f:
-            for record in ArchiveIterator(f):
-                # Only process response records with HTML content
-                if record.rec_type == 'response' and record.http_headers and \
-                   record.http_headers.get_header('Content-Type', '').startswith('text/html'):
-                    
-                    content = record.content_stream().read()
-                    
-                    try:
-                        # Extract text from HTML content
-                        text = extract_text_from_html_bytes(content)
-                        
-                        # Skip empty or very short texts
-                        if text and len(text.strip()) > 100:
-                            # Check language - only keep English
-                            lang, confidence = identify_language(text)
-                            if lang == "en" and confidence > 0.8:
-                                samples.append(text)
-                        
-                        # Break early if we have enough samples
-                        if len(samples) >= num_samples:
-                            break
-                    except Exception:
-                        continue
+        # Pages of 100 bytes or fewer cannot hold more than 100 characters of text
+        payloads = (payload for _, payload in iter_warc_html(warc_file, max_html_bytes, min_bytes=101))
+        
+        # Leaving the with block terminates the workers, including after an early break
+        with Pool(processes=os.cpu_count() or 1) as pool:
+            for text in pool.imap_unordered(_process_html, payloads, chunksize=16):
+                if text is not None:
+                    samples.append(text)
+                
+                # Break early if we have enough samples
+                if len(samples) >= num_samples:
+                    break
     except Exception as e:
         print(f"Error processing WARC file: {e}")
     
@@ -132,77 +170,76 @@ def extract_wiki_reference_samples(wiki_urls_file: str, num_samples: int = 1000)
         print(f"Error reading Wiki URLs file: {e}")
         return samples
     
-    # Try to download and extract text from URLs
+    # Download and extract text from URLs in a pool of threads, since the downloads
+    # spend most of their time waiting on the network; the texts are filtered here.
+    # Only a fixed window of downloads is in flight, refilled from the URL list as
+    # downloads finish, so no more URLs are fetched than needed
+    urls = iter(url for url in urls if url.startswith(('http://', 'https://')))
     count = 0
-    for url in urls:
-        if not url.startswith(('http://', 'https://')):
-            continue
+    with ThreadPoolExecutor(max_workers=URL_FETCH_WORKERS) as executor:
+        pending = {executor.submit(extract_text_from_url, url) for url in islice(urls, 2 * URL_FETCH_WORKERS)}
+        while pending and count < num_samples:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            pending |= {executor.submit(extract_text_from_url, url) for url in islice(urls, len(done))}
             
-        text = extract_text_from_url(url)
-        if text and len(text.strip()) > 100:
-            # Check language - only keep English
-            lang, confidence = identify_language(text)
-            if lang == "en" and confidence > 0.8:
-                # Apply Gopher quality filters to ensure we have high quality examples
-                if gopher_quality_filter(text):
-                    samples.append(text)
-                    count += 1
-                    
-                    # Print progress
-                    if count % 10 == 0:
-                        print(f"Processed {count} wiki samples")
-                        
-                    # Stop when we have enough samples
-                    if count >= num_samples:
-                        break
+            for future in done:
+                text = future.result()
+                if count < num_samples and text and len(text.strip()) > 100 and _likely_english(text):
+                    # Check language - only keep English
+                    lang, confidence = identify_language(text)
+                    if lang == "en" and confidence > 0.8:
+                        # Apply Gopher quality filters to ensure we have high quality examples
+                        if gopher_quality_filter(text):
+                            samples.append(text)
+                            count += 1
+                            
+                            # Print progress
+                            if count % 10 == 0:
+                                print(f"Processed {count} wiki samples")
+        
+        # Drop the downloads that have not started yet
+        for future in pending:
+            future.cancel()
     
     return samples
 
 
-def clean_text_for_fasttext(text: str) -> str:
+def clean_text_for_fasttext(text: str, max_length: Optional[int] = None) -> str:
     """
     Clean and normalize text for fastText training.
     
     Args:
         text: Input text
+        max_length: If given, truncate the cleaned text to this many characters
         
     Returns:
         Cleaned text
     """
-    # Replace newlines with spaces
-    text = text.replace('\n', ' ')
-    
-    # Replace multiple spaces with a single space
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    # Replace quotes that could cause parsing issues
-    text = text.replace('"', ' ')
-    
-    return text
+    # Replace quotes that could cause parsing issues, then collapse whitespace (including
+    # newlines) to single spaces in one pass
+    return _WHITESPACE_RE.sub(' ', text.replace('"', ' ')).strip()[:max_length]
 
 
 def create_training_data(wiki_samples: List[str], cc_samples: List[str], output_file: str):
     """
-    Create a fastText training file with labeled examples.
+    Create a fastText training file with labeled examples, in random order.
     
     Args:
         wiki_samples: List of high-quality wiki samples
         cc_samples: List of low-quality CC samples
         output_file: Path to write training data
     """
+    # High-quality examples (wiki) and low-quality examples (cc), shuffled together
+    # (only the references are shuffled, not the texts)
+    examples = [("wiki", text) for text in wiki_samples] + [("cc", text) for text in cc_samples]
+    random.shuffle(examples)
+    
     with open(output_file, 'w', encoding='utf-8') as f:
-        # Write high-quality examples (wiki)
-        for text in wiki_samples:
-            cleaned_text = clean_text_for_fasttext(text)
+        for label, text in examples:
             # Take first 1000 chars to avoid huge training examples
+            cleaned_text = clean_text_for_fasttext(text, MAX_EXAMPLE_LENGTH)
             if cleaned_text:
-                f.write(f"__label__wiki {cleaned_text[:1000]}\n")
-        
-        # Write low-quality examples (cc)
-        for text in cc_samples:
-            cleaned_text = clean_text_for_fasttext(text)
-            if cleaned_text:
-                f.write(f"__label__cc {cleaned_text[:1000]}\n")
+                f.write(f"__label__{label} {cleaned_text}\n")
 
 
 def train_fasttext_model(train_file: str, output_model: str):
@@ -213,24 +250,23 @@ def train_fasttext_model(train_file: str, output_model: str):
         train_file: Path to training data file
         output_model: Path to save trained model
     """
-    # Create a balanced train/test split
-    train_data = []
+    # Create a random 80/20 train/test split without holding the examples in memory:
+    # count them, pick the training examples by index, then stream the file once
     with open(train_file, 'r', encoding='utf-8') as f:
-        train_data = f.readlines()
-    
-    random.shuffle(train_data)
-    split_point = int(len(train_data) * 0.8)
+        num_examples = sum(1 for _ in f)
+    split_point = int(num_examples * 0.8)
+    train_indices = set(random.sample(range(num_examples), split_point))
     
     # Write train/test files
     temp_dir = tempfile.mkdtemp()
     train_temp = os.path.join(temp_dir, "train.txt")
     test_temp = os.path.join(temp_dir, "test.txt")
     
-    with open(train_temp, 'w', encoding='utf-8') as f:
-        f.writelines(train_data[:split_point])
-    
-    with open(test_temp, 'w', encoding='utf-8') as f:
-        f.writelines(train_data[split_point:])
+    with open(train_file, 'r', encoding='utf-8') as f, \
+            open(train_temp, 'w', encoding='utf-8') as train_f, \
+            open(test_temp, 'w', encoding='utf-8') as test_f:
+        for i, line in enumerate(f):
+            (train_f if i in train_indices else test_f).write(line)
     
     # Train the model
     model = fasttext.train_supervised(
@@ -240,7 +276,8 @@ def train_fasttext_model(train_file: str, output_model: str):
         wordNgrams=2,
         bucket=200000,
         dim=100,
-        loss='softmax'
+        loss='softmax',
+        thread=os.cpu_count() or 1
     )
     
     # Evaluate on test data
@@ -263,6 +300,8 @@ def main():
     parser.add_argument('--wiki-urls', help='Path to Wikipedia reference URLs file for high-quality examples')
     parser.add_argument('--cc-samples', type=int, default=1000, help='Number of CC samples to extract')
     parser.add_argument('--wiki-samples', type=int, default=1000, help='Number of Wiki samples to extract')
+    parser.add_argument('--max-html-bytes', type=int, default=MAX_HTML_BYTES,
+                        help='Maximum number of bytes read from each Common Crawl HTML page')
     parser.add_argument('--output-model', default='quality_classifier.bin', help='Output model file')
     parser.add_argument('--use-test-data', action='store_true', help='Use test fixtures instead of real data')
     args = parser.parse_args()
@@ -327,7 +366,7 @@ def main():
         
         # Extract samples
         print(f"Extracting {args.cc_samples} samples from Common Crawl...")
-        cc_samples = extract_common_crawl_samples(args.cc_warc, args.cc_samples)
+        cc_samples = extract_common_crawl_samples(args.cc_warc, args.cc_samples, args.max_html_bytes)
         print(f"Extracted {len(cc_samples)} Common Crawl samples")
         
         print(f"Extracting {args.wiki_samples} samples from Wikipedia references...")
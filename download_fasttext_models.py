@@ -10,9 +10,12 @@ import os
 import sys
 import urllib.request
 import ssl
+import shutil
 import platform
 import subprocess
 from pathlib import Path
+from itertools import repeat
+from concurrent.futures import ThreadPoolExecutor
 
 # For macOS, explicitly set SSL certificates path
 if platform.system() == 'Darwin':
@@ -36,6 +39,25 @@ MODEL_URLS = {
     "dolma-jigsaw-fasttext-bigrams-hatespeech.bin": "https://dolma-artifacts.org/fasttext_models/jigsaw_fasttext_bigrams_20230515/jigsaw_fasttext_bigrams_hatespeech_final.bin"
 }
 
+def get_remote_size(model_url, ssl_context):
+    """
+    Get the size of a remote file with a HEAD request.
+    
+    Args:
+        model_url: URL of the file
+        ssl_context: SSL context to use for the request
+    
+    Returns:
+        The size in bytes, or None if it could not be determined
+    """
+    try:
+        request = urllib.request.Request(model_url, method='HEAD')
+        with urllib.request.urlopen(request, context=ssl_context, timeout=30) as response:
+            content_length = response.headers.get('Content-Length')
+    except Exception:
+        return None
+    return int(content_length) if content_length and content_length.isdigit() else None
+
 def download_model(model_name, model_url, target_dir):
     """
     Download a model if it doesn't exist.
@@ -51,32 +73,37 @@ def download_model(model_name, model_url, target_dir):
     # Full path to the model file
     model_path = os.path.join(target_dir, model_name)
     
-    # Check if the model already exists
+    # Create a context that ignores SSL verification
+    ssl_context = ssl._create_unverified_context()
+    
+    # Check if the model already exists; a file whose size differs from the remote
+    # one (e.g. left by an interrupted download) is downloaded again
     if os.path.exists(model_path):
-        print(f"Model already exists at {model_path}")
-        return
+        remote_size = get_remote_size(model_url, ssl_context)
+        if remote_size is None or os.path.getsize(model_path) == remote_size:
+            print(f"Model already exists at {model_path}")
+            return
+        print(f"Model at {model_path} is incomplete")
     
     print(f"Downloading model {model_name} from {model_url}")
     print(f"This might take a while as the model files are large...")
     
     try:
-        # Create a context that ignores SSL verification
-        ssl_context = ssl._create_unverified_context()
-        
         # Try using curl or wget if available
         if platform.system() == "Darwin" or platform.system() == "Linux":
             try:
                 print("Attempting to download with curl...")
-                subprocess.run(['curl', '-L', '-o', model_path, model_url], check=True)
+                # Fail on HTTP errors instead of saving the error page, and retry transient failures
+                subprocess.run(['curl', '-sS', '-L', '--fail', '--retry', '3', '--retry-delay', '2',
+                                '-o', model_path, model_url], check=True)
                 print(f"Successfully downloaded {model_name} to {model_path}")
                 return
             except (subprocess.SubprocessError, FileNotFoundError) as e:
                 print(f"Curl failed: {e}. Trying with Python urllib...")
         
-        # Fall back to urllib if curl fails
+        # Fall back to urllib if curl fails, streaming the model to disk in 1 MB chunks
         with urllib.request.urlopen(model_url, context=ssl_context) as response, open(model_path, 'wb') as out_file:
-            data = response.read()
-            out_file.write(data)
+            shutil.copyfileobj(response, out_file, length=1024 * 1024)
             
         print(f"Successfully downloaded {model_name} to {model_path}")
     except Exception as e:
@@ -93,9 +120,10 @@ def main():
     # Target directory for the models
     target_dir = os.path.join(script_dir, "cs336_data", "models")
     
-    # Download each model
-    for model_name, model_url in MODEL_URLS.items():
-        download_model(model_name, model_url, target_dir)
+    # Download the models concurrently, since the downloads are network-bound
+    # (a failed download's sys.exit is re-raised here)
+    with ThreadPoolExecutor(max_workers=len(MODEL_URLS)) as executor:
+        list(executor.map(download_model, MODEL_URLS.keys(), MODEL_URLS.values(), repeat(target_dir)))
     
     print("\nAll models downloaded successfully!")
     print("You can now use the NSFW and toxic speech classification functions.")
@@ -9,94 +9,163 @@ This script extracts text from WARC files, analyzes it for harmful content
 import os
 import sys
 import random
-import gzip
+import argparse
 from pathlib import Path
 from datetime import datetime
+from bisect import bisect_right
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
-from warcio.archiveiterator import ArchiveIterator
 from cs336_data.data import (
+    iter_warc_html,
     extract_text_from_html_bytes,
-    classify_nsfw,
-    classify_toxic_speech
+    classify_nsfw_batch,
+    classify_toxic_speech_batch
 )
 
+# Confidence thresholds reported in the threshold analysis, in increasing order
+THRESHOLDS = [0.5, 0.6, 0.7, 0.8, 0.9]
 
-def analyze_warc_file(warc_path, num_samples=20, min_text_length=100):
+# WARC file analyzed when no path is given
+DEFAULT_WARC_PATH = "/Users/lenox/Desktop/ECE491B/assignment2/s2025-assignment2-data/data/CC-MAIN-20180420081400-20180420101400-00118.warc.gz"
+
+
+def sample_warc_file(warc_path, num_samples=20, min_text_length=100):
     """
-    Analyze a WARC file for harmful content.
+    Extract the text of a WARC file's HTML responses and sample from it at random.
     
     Args:
         warc_path: Path to the WARC file
-        num_samples: Number of random samples to analyze
+        num_samples: Number of random samples to keep
         min_text_length: Minimum text length to consider for analysis
     
     Returns:
-        List of tuples (text, nsfw_result, toxic_result)
+        Tuple (selected_texts, num_texts) of the sampled texts and the number of texts seen
     """
     print(f"Analyzing WARC file: {warc_path}")
     
+    # Reservoir of sampled texts; only num_samples texts are held in memory. The random
+    # generator is local and seeded from the OS, so that reservoirs sampled in forked
+    # worker processes are independent
+    rng = random.Random()
+    reservoir = []
+    n_seen = 0
+    
+    # Process the WARC file; iter_warc_html parses it with FastWARC when it is installed
+    # and yields only the payloads of response records with HTML content. A page's text
+    # is never longer than its HTML, so payloads too short to hold min_text_length
+    # characters are skipped before text extraction
+    for _, html_content in iter_warc_html(warc_path, min_bytes=min_text_length):
+        # Extract text from HTML content
+        try:
+            text = extract_text_from_html_bytes(html_content)
+            
+            # Skip texts that are too short
+            if len(text) < min_text_length:
+                continue
+            
+            # Reservoir sampling: every text is kept with probability num_samples / n_seen
+            n_seen += 1
+            if len(reservoir) < num_samples:
+                reservoir.append(text)
+            else:
+                j = rng.randrange(n_seen)
+                if j < num_samples:
+                    reservoir[j] = text
+        except Exception as e:
+            print(f"Error extracting text: {e}")
+            continue
+    
+    # The reservoir holds num_samples texts (or all if fewer were found)
+    return reservoir, n_seen
+
+
+def merge_reservoirs(reservoirs, num_samples):
+    """
+    Merge per-file reservoir samples into one uniform random sample of all texts.
+    
+    Texts are drawn one at a time without replacement: each draw picks a file with
+    probability proportional to its number of texts not drawn yet, then a random
+    text of that file's reservoir.
+    
+    Args:
+        reservoirs: List of tuples (selected_texts, num_texts), as from sample_warc_file
+        num_samples: Number of texts to draw
+    
+    Returns:
+        List of the drawn texts
+    """
+    rng = random.Random()
+    
+    # Shuffled copies of the reservoirs, so that popping gives random texts
+    pools = [rng.sample(texts, len(texts)) for texts, _ in reservoirs]
+    remaining = [num_texts for _, num_texts in reservoirs]
+    
+    merged = []
+    while len(merged) < num_samples and sum(remaining) > 0:
+        i = rng.choices(range(len(pools)), weights=remaining)[0]
+        merged.append(pools[i].pop())
+        remaining[i] -= 1
+    
+    return merged
+
+
+def classify_samples(selected_texts):
+    """
+    Classify sampled texts for harmful content.
+    
+    Args:
+        selected_texts: Texts to classify
+    
+    Returns:
+        List of tuples (text, nsfw_result, toxic_result)
+    """
     # List to store text samples and their analysis results
     samples = []
-    all_texts = []
-    
-    # Process the WARC file
-    open_func = gzip.open if str(warc_path).endswith('.gz') else open
-    
-    with open_func(warc_path, 'rb') as warc_file:
-        for record in ArchiveIterator(warc_file):
-            # Only process response records with HTML content
-            if (record.rec_type == 'response' and 
-                record.http_headers and 
-                record.http_headers.get_header('Content-Type') and 
-                'text/html' in record.http_headers.get_header('Content-Type').lower()):
-                
-                # Extract text from HTML content
-                html_content = record.content_stream().read()
-                try:
-                    text = extract_text_from_html_bytes(html_content)
-                    
-                    # Skip texts that are too short
-                    if len(text) < min_text_length:
-                        continue
-                    
-                    # Store the extracted text
-                    all_texts.append(text)
-                except Exception as e:
-                    print(f"Error extracting text: {e}")
-                    continue
-    
-    # If we have enough texts, select random samples
-    if len(all_texts) > 0:
-        # Choose random samples (or all if fewer than requested)
-        sample_size = min(num_samples, len(all_texts))
-        selected_texts = random.sample(all_texts, sample_size)
+    
+    if selected_texts:
+        # Classify all selected texts with one model call per classifier
+        nsfw_results = classify_nsfw_batch(selected_texts)
+        toxic_results = classify_toxic_speech_batch(selected_texts)
         
-        # Analyze each selected text
-        for text in selected_texts:
-            # Truncate text for display
-            display_text = text[:500] + "..." if len(text) > 500 else text
-            
-            # Classify the text
-            nsfw_result = classify_nsfw(text)
-            toxic_result = classify_toxic_speech(text)
-            
-            # Add to samples
-            samples.append((display_text, nsfw_result, toxic_result))
+        # Pair each selected text with its results (the text is truncated for display
+        # only when the results are formatted)
+        samples.extend(zip(selected_texts, nsfw_results, toxic_results))
+    
+    return samples
+
+
+def analyze_warc_file(warc_path, num_samples=20, min_text_length=100):
+    """
+    Analyze a WARC file for harmful content.
+    
+    Args:
+        warc_path: Path to the WARC file
+        num_samples: Number of random samples to analyze
+        min_text_length: Minimum text length to consider for analysis
     
-    return samples, len(all_texts)
+    Returns:
+        List of tuples (text, nsfw_result, toxic_result)
+    """
+    selected_texts, num_texts = sample_warc_file(warc_path, num_samples, min_text_length)
+    return classify_samples(selected_texts), num_texts
 
 
-def print_analysis_results(samples):
+def format_analysis_results(samples):
     """
-    Print the analysis results in a readable format.
+    Format the analysis results in a readable format.
     
     Args:
         samples: List of tuples (text, nsfw_result, toxic_result)
+    
+    Returns:
+        The report as a single string, ready to be written out in one call
     """
-    print("\n" + "="*80)
-    print(" HARMFUL CONTENT ANALYSIS RESULTS ".center(80, "="))
-    print("="*80 + "\n")
+    lines = []
+    
+    lines.append("\n" + "="*80)
+    lines.append(" HARMFUL CONTENT ANALYSIS RESULTS ".center(80, "="))
+    lines.append("="*80 + "\n")
     
     # Track statistics
     nsfw_count = 0
@@ -104,11 +173,11 @@ def print_analysis_results(samples):
     nsfw_confidence_sum = 0
     toxic_confidence_sum = 0
     
-    # Confidence threshold counters
-    nsfw_thresholds = {0.5: 0, 0.6: 0, 0.7: 0, 0.8: 0, 0.9: 0}
-    toxic_thresholds = {0.5: 0, 0.6: 0, 0.7: 0, 0.8: 0, 0.9: 0}
+    # Confidence histograms: bucket i counts confidences in [THRESHOLDS[i - 1], THRESHOLDS[i])
+    nsfw_buckets = [0] * (len(THRESHOLDS) + 1)
+    toxic_buckets = [0] * (len(THRESHOLDS) + 1)
     
-    # Print each sample with its classification
+    # Add each sample with its classification
     for i, (text, nsfw_result, toxic_result) in enumerate(samples, 1):
         nsfw_label, nsfw_confidence = nsfw_result
         toxic_label, toxic_confidence = toxic_result
@@ -117,52 +186,56 @@ def print_analysis_results(samples):
         if nsfw_label == "nsfw":
             nsfw_count += 1
             nsfw_confidence_sum += nsfw_confidence
-            # Update threshold counters
-            for threshold in nsfw_thresholds:
-                if nsfw_confidence >= threshold:
-                    nsfw_thresholds[threshold] += 1
+            # Update the confidence histogram
+            nsfw_buckets[bisect_right(THRESHOLDS, nsfw_confidence)] += 1
         
         if toxic_label == "toxic":
             toxic_count += 1
             toxic_confidence_sum += toxic_confidence
-            # Update threshold counters
-            for threshold in toxic_thresholds:
-                if toxic_confidence >= threshold:
-                    toxic_thresholds[threshold] += 1
+            # Update the confidence histogram
+            toxic_buckets[bisect_right(THRESHOLDS, toxic_confidence)] += 1
         
-        # Print the sample
-        print(f"SAMPLE {i}:")
-        print(f"Text: {text}")
-        print(f"NSFW: {nsfw_label} (confidence: {nsfw_confidence:.4f})")
-        print(f"Toxic: {toxic_label} (confidence: {toxic_confidence:.4f})")
-        print("-"*80)
-    
-    # Print summary statistics
+        # Add the sample, truncating its text for display
+        display_text = text[:500] + "..." if len(text) > 500 else text
+        lines.append(f"SAMPLE {i}:")
+        lines.append(f"Text: {display_text}")
+        lines.append(f"NSFW: {nsfw_label} (confidence: {nsfw_confidence:.4f})")
+        lines.append(f"Toxic: {toxic_label} (confidence: {toxic_confidence:.4f})")
+        lines.append("-"*80)
+    
+    # Summary statistics
     total_samples = len(samples)
-    print("\nSUMMARY STATISTICS:")
-    print(f"Total samples analyzed: {total_samples}")
-    print(f"NSFW content: {nsfw_count} ({nsfw_count/total_samples*100:.1f}%)")
-    print(f"Toxic content: {toxic_count} ({toxic_count/total_samples*100:.1f}%)")
+    lines.append("\nSUMMARY STATISTICS:")
+    lines.append(f"Total samples analyzed: {total_samples}")
+    lines.append(f"NSFW content: {nsfw_count} ({nsfw_count/total_samples*100:.1f}%)")
+    lines.append(f"Toxic content: {toxic_count} ({toxic_count/total_samples*100:.1f}%)")
+    
+    # Threshold analysis: samples at or above a threshold are those in the buckets after it
+    lines.append("\nNSFW THRESHOLD ANALYSIS:")
+    for i, threshold in enumerate(THRESHOLDS):
+        count = sum(nsfw_buckets[i + 1:])
+        lines.append(f"  >= {threshold:.1f}: {count} samples ({count/total_samples*100:.1f}%)")
     
-    # Print threshold analysis
-    print("\nNSFW THRESHOLD ANALYSIS:")
-    for threshold, count in sorted(nsfw_thresholds.items()):
-        print(f"  >= {threshold:.1f}: {count} samples ({count/total_samples*100:.1f}%)")
+    lines.append("\nTOXIC THRESHOLD ANALYSIS:")
+    for i, threshold in enumerate(THRESHOLDS):
+        count = sum(toxic_buckets[i + 1:])
+        lines.append(f"  >= {threshold:.1f}: {count} samples ({count/total_samples*100:.1f}%)")
     
-    print("\nTOXIC THRESHOLD ANALYSIS:")
-    for threshold, count in sorted(toxic_thresholds.items()):
-        print(f"  >= {threshold:.1f}: {count} samples ({count/total_samples*100:.1f}%)")
+    lines.append("\nNOTE: Please manually verify these classifications and note any errors.")
+    lines.append("Based on your observations, determine suitable confidence thresholds.")
     
-    print("\nNOTE: Please manually verify these classifications and note any errors.")
-    print("Based on your observations, determine suitable confidence thresholds.")
+    return "\n".join(lines) + "\n"
 
 
 def main():
     """
     Main function to run the harmful content analysis.
     """
-    # Hard-coded path to the specific WARC file
-    warc_path = Path("/Users/lenox/Desktop/ECE491B/assignment2/s2025-assignment2-data/data/CC-MAIN-20180420081400-20180420101400-00118.warc.gz")
+    parser = argparse.ArgumentParser(description="Analyze WARC files for harmful content")
+    parser.add_argument("warc_path", nargs="?", default=DEFAULT_WARC_PATH,
+                        help="Path to WARC file or directory containing WARC files")
+    args = parser.parse_args()
+    warc_path = Path(args.warc_path)
     
     # Fixed parameters
     num_samples = 20
@@ -180,28 +253,41 @@ def main():
         print(f"Error: Path {warc_path} does not exist.")
         sys.exit(1)
     
-    print(f"Analyzing WARC file: {warc_path}")
-    
-    # Process the WARC file
-    samples, doc_count = analyze_warc_file(warc_path, num_samples, min_text_length)
-    all_samples.extend(samples)
-    total_documents += doc_count
+    # Process the WARC file(s)
+    if warc_path.is_dir():
+        # Directory of WARC files
+        warc_files = sorted(warc_path.glob('*.warc')) + sorted(warc_path.glob('*.warc.gz'))
+        if not warc_files:
+            print(f"Error: No WARC files found in {warc_path}")
+            sys.exit(1)
+        
+        # Sample the files in parallel, then merge the per-file samples into a uniform
+        # sample of all texts and classify it in this process
+        with ProcessPoolExecutor(max_workers=min(len(warc_files), os.cpu_count() or 1)) as executor:
+            futures = [
+                executor.submit(sample_warc_file, warc_file, num_samples, min_text_length)
+                for warc_file in warc_files
+            ]
+            reservoirs = [future.result() for future in futures]
+        
+        selected_texts = merge_reservoirs(reservoirs, num_samples)
+        all_samples.extend(classify_samples(selected_texts))
+        total_documents += sum(num_texts for _, num_texts in reservoirs)
+    else:
+        # Single WARC file
+        samples, doc_count = analyze_warc_file(warc_path, num_samples, min_text_length)
+        all_samples.extend(samples)
+        total_documents += doc_count
     
     # Print results
     if all_samples:
-        # Save to file and print to console
+        # Format the report once, then save it to file and print it to console
+        report = format_analysis_results(all_samples)
         with open(output_file, 'w', encoding='utf-8') as f:
-            # Redirect stdout to file
-            original_stdout = sys.stdout
-            sys.stdout = f
-            
-            print_analysis_results(all_samples)
-            
-            # Restore stdout
-            sys.stdout = original_stdout
+            f.write(report)
         
         print(f"\nResults saved to {output_file}")
-        print_analysis_results(all_samples)
+        sys.stdout.write(report)
         
         print(f"\nTotal documents processed: {total_documents}")
         harmful_count = sum(1 for _, (nsfw_label, _), (toxic_label, _) in all_samples if nsfw_label == "nsfw" or toxic_label == "toxic")